@@ -0,0 +1,75 @@
+"""
+Vectorised horizontal coordinates with NumPy: local sidereal time and a
+rotation from equatorial to horizontal coordinates, for one position or
+whole catalogues at once.
+
+J2000 positions are first precessed to the mean equinox of date (see
+precession.py). Nutation, aberration and the UT1-UTC difference are
+neglected: compared with astropy the positions agree within TOLERANCE
+degrees, plenty for horizon checks and catalogue-wide listings.
+"""
+
+import numpy as np
+from precession import JD_J2000, julianDate, precess
+
+# agreement with astropy, degrees, see bench/check_altaz.py
+TOLERANCE = 0.02
+
+# standard atmosphere used by the refraction model
+PRESSURE = 1010.0     # hPa
+TEMPERATURE = 10.0    # °C
+
+
+def gmst(jd):
+    """ Greenwich mean sidereal time in degrees (IAU 1982 expression) """
+    d = jd - JD_J2000
+    T = d / 36525.0
+    theta = 280.46061837 + 360.98564736629 * d \
+        + 0.000387933 * T ** 2 - T ** 3 / 38710000.0
+    return np.mod(theta, 360.0)
+
+
+def refraction(alt, pressure=PRESSURE, temperature=TEMPERATURE):
+    """
+    Atmospheric refraction in degrees to add to a true altitude in degrees
+    (Saemundsson formula, scaled for pressure in hPa and temperature in °C)
+    """
+    alt = np.asarray(alt, dtype=np.float64)
+    # the formula diverges well below the horizon, where it is meaningless
+    h = np.maximum(alt, -1.0)
+    r = 1.02 / np.tan(np.radians(h + 10.3 / (h + 5.11))) / 60.0
+    return r * (pressure / 1010.0) * (283.0 / (273.0 + temperature))
+
+
+def radec2altaz(ra, dec, lat, lon, jd=None, j2000=False, refract=False):
+    """
+    Convert ra and dec in decimal degrees (scalars or arrays) to altitude
+    and azimuth in degrees, azimuth measured from North through East, for
+    an observer at lat/lon (degrees, East positive) at Julian date jd.
+    ra and dec are of date unless j2000 is set, in which case they are
+    precessed first. refract adds the refraction of a standard atmosphere
+    to the altitude.
+    """
+    if jd is None:
+        jd = julianDate()
+    if j2000:
+        ra, dec = precess(ra, dec, jd)
+    ha = np.radians(gmst(jd) + lon - np.asarray(ra, dtype=np.float64))
+    dec = np.radians(np.asarray(dec, dtype=np.float64))
+    lat = np.radians(lat)
+
+    # unit vector in the local equatorial frame (hour angle, dec)
+    x = np.cos(dec) * np.cos(ha)
+    y = np.cos(dec) * np.sin(ha)
+    z = np.sin(dec)
+
+    # rotate about the East-West axis by the colatitude
+    sinLat, cosLat = np.sin(lat), np.cos(lat)
+    xh = x * sinLat - z * cosLat
+    zh = x * cosLat + z * sinLat
+
+    alt = np.degrees(np.arcsin(np.clip(zh, -1.0, 1.0)))
+    az = np.mod(np.degrees(np.arctan2(y, xh)) + 180.0, 360.0)
+    if refract:
+        alt = alt + refraction(alt)
+    return alt, az
@@ -0,0 +1,173 @@
+"""
+asyncio facade over IndiClient and Device.
+
+PyIndi callbacks are bridged into the event loop with
+call_soon_threadsafe: a coroutine waiting for a property is a future
+woken up by the server's updates, not a thread. This lets one process
+drive several devices, on one or more INDI servers, concurrently:
+
+    client = AsyncIndiClient(IndiClient())
+    await client.connect('localhost', 7624)
+    mount, focuser = await asyncio.gather(
+        client.device('Telescope Simulator'),
+        client.device('Focuser Simulator'))
+    await asyncio.gather(
+        mount.set_number_async('EQUATORIAL_EOD_COORD', {'RA': 5.5, 'DEC': 22}),
+        focuser.set_number_async('ABS_FOCUS_POSITION', {'FOCUS_ABSOLUTE_POSITION': 3000}))
+"""
+
+import asyncio
+from device import Device
+
+
+class AsyncIndiClient:
+
+    def __init__(self, client, loop=None):
+        self.client = client
+        self.loop = loop or asyncio.get_running_loop()
+        # (device, property) -> futures of the coroutines waiting on it
+        self.__waiters = {}
+        client.addListener(self.__listener)
+
+    def close(self):
+        """ Stop receiving the client callbacks """
+        self.client.removeListener(self.__listener)
+
+    def __listener(self, event, device, prop):
+        # PyIndi thread: hand over to the event loop
+        self.loop.call_soon_threadsafe(self.__wake, event, device, prop)
+
+    def __wake(self, event, device, prop):
+        if event == 'serverDisconnected':
+            keys = list(self.__waiters)
+        else:
+            keys = [(device, prop), (device, None)]
+        for key in keys:
+            for future in self.__waiters.pop(key, ()):
+                if not future.done():
+                    future.set_result(None)
+
+    async def wait_for(self, predicate, device, prop=None, timeout=None):
+        """
+        Wait until predicate() is true, evaluating it again each time the
+        server sends something about device/prop (or the device itself if
+        prop is None). Return False if timeout seconds elapse first.
+        """
+        deadline = None if timeout is None else self.loop.time() + timeout
+        key = (device, prop)
+        while not predicate():
+            remaining = None if deadline is None else deadline - self.loop.time()
+            if remaining is not None and remaining <= 0:
+                return False
+            future = self.loop.create_future()
+            self.__waiters.setdefault(key, []).append(future)
+            try:
+                await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                waiters = self.__waiters.get(key)
+                if waiters and future in waiters:
+                    waiters.remove(future)
+        return True
+
+    async def connect(self, host, port):
+        """ Connect to an INDI server, return True on success """
+        self.client.setServer(host, port)
+        # connectServer blocks on the socket, run it out of the loop
+        return await self.loop.run_in_executor(None, self.client.connectServer)
+
+    async def disconnect(self):
+        await self.loop.run_in_executor(None, self.client.disconnectServer)
+
+    async def wait_device(self, name, timeout=Device.DEFAULT_TIMEOUT):
+        """ Return the PyIndi device once announced, None after timeout """
+        await self.wait_for(lambda: self.client.getDevice(name), name, timeout=timeout)
+        return self.client.getDevice(name)
+
+    async def device(self, name, timeout=Device.DEFAULT_TIMEOUT):
+        """ Return an AsyncDevice once the server has announced it """
+        if not await self.wait_device(name, timeout):
+            raise RuntimeError('Timeout finding device {}'.format(name))
+        return AsyncDevice(self, Device(name, self.client))
+
+
+class AsyncDevice:
+    """
+    Coroutine versions of the Device methods. Property states are read
+    from the client's property mirror.
+    """
+
+    def __init__(self, async_client, device):
+        self.async_client = async_client
+        self.device = device
+        self.name = device.name
+        self.mirror = async_client.client.mirror
+
+    @property
+    def timeout(self):
+        return self.device.timeout
+
+    def __timeout(self, timeout):
+        timeout = self.timeout if timeout is None else timeout
+        return timeout if timeout > 0 else None
+
+    async def wait_property(self, name, timeout=None):
+        """ Wait for the server to define a property, return its record """
+        found = await self.async_client.wait_for(
+            lambda: self.mirror.get(self.name, name) is not None,
+            self.name, name, self.__timeout(timeout))
+        if not found:
+            raise RuntimeError('Timeout finding control {}'.format(name))
+        return self.mirror.get(self.name, name)
+
+    async def wait_state(self, name, states=('OK', 'IDLE'), timeout=None, after=0):
+        """
+        Wait until property name is in one of states ('IDLE', 'OK', 'BUSY',
+        'ALERT'), considering only records newer than version after.
+        Raise RuntimeError if the server answers ALERT or on timeout.
+        """
+        def reached():
+            record = self.mirror.get(self.name, name)
+            if record is None or record.version <= after:
+                return False
+            if record.state == 'ALERT' and 'ALERT' not in states:
+                raise RuntimeError('Error while changing property {}'.format(name))
+            return record.state in states
+
+        if not await self.async_client.wait_for(reached, self.name, name, self.__timeout(timeout)):
+            record = self.mirror.get(self.name, name)
+            raise RuntimeError('Timeout error while changing property {}: timeout={}, status={}'.format(
+                name, timeout, record.state if record else None))
+        return self.mirror.get(self.name, name)
+
+    async def __set(self, method, name, args, sync, timeout):
+        record = await self.wait_property(name, timeout)
+        # send without blocking, then wait for the server's answer
+        getattr(self.device, method)(name, *args, sync=False)
+        if sync:
+            return await self.wait_state(name, timeout=timeout, after=record.version)
+        return record
+
+    async def set_switch_async(self, name, on_switches=[], off_switches=[], sync=True, timeout=None):
+        return await self.__set('set_switch', name, (on_switches, off_switches), sync, timeout)
+
+    async def set_number_async(self, name, values, sync=True, timeout=None):
+        return await self.__set('set_number', name, (values,), sync, timeout)
+
+    async def set_text_async(self, name, values, sync=True, timeout=None):
+        return await self.__set('set_text', name, (values,), sync, timeout)
+
+    async def connect_async(self, timeout=None):
+        if self.device.connected:
+            return
+        await self.set_switch_async('CONNECTION', ['CONNECT'], timeout=timeout)
+
+    async def get_property_async(self, name, timeout=None):
+        """ Return the dictionary of a property, waiting for it if needed """
+        return self.mirror.toDict(await self.wait_property(name, timeout))
+
+    async def values_async(self, name, timeout=None):
+        """ Return {element: value} of a property, waiting for it if needed """
+        await self.wait_property(name, timeout)
+        return self.mirror.values(self.name, name)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""
+Latency of Device commands against the in-process INDI stand-in of
+fakeIndi.py: a simulated telescope answering after --latency seconds each
+way, slewing at --slew-rate degrees per second.
+
+Scenarios:
+- switch: set_switch round trips on ON_COORD_SET
+- number: set_number round trips on GEOGRAPHIC_COORD
+- concurrent: --threads threads doing set_number round trips on their own
+  property while the mount reports its position --flood times per second
+- slew: gotos of 10 to 90 degrees, waiting for EQUATORIAL_EOD_COORD to be OK
+
+For each: throughput, latency percentiles and histogram, and the CPU used
+by the client side (the whole process minus the server thread).
+
+Usage: python bench/bench_indi.py [--count N] [--latency s] [--threads N]
+                                  [--flood Hz] [--slew-rate deg/s]
+                                  [--only scenario,...] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+import numpy as np  # noqa: E402
+import fakeIndi  # noqa: E402
+
+DEVICE = 'Telescope Simulator'
+# upper bounds of the histogram buckets, milliseconds
+BUCKETS = [0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float('inf')]
+# width of the longest histogram bar
+BAR = 40
+
+
+def start(args):
+    """ Start the server and a connected client, return (server, telescope driver, client, device) """
+    server = fakeIndi.install(latency=args.latency)
+    telescope = fakeIndi.Telescope(DEVICE, slewRate=args.slew_rate, updateRate=20.0)
+    for i in range(args.threads):
+        telescope.define(fakeIndi.number(DEVICE, 'BENCH_%d' % i, [('VALUE', 0.0, 0, 1e9)]))
+    server.addDriver(telescope)
+
+    # imported once PyIndi is the stand-in
+    from indiClient import IndiClient
+    from device import Device
+    client = IndiClient()
+    client.setServer('localhost', 7624)
+    if not client.connectServer():
+        raise RuntimeError('Cannot connect to the INDI stand-in')
+    device = Device(DEVICE, client)
+    device.connect()
+    return server, telescope, client, device
+
+
+class Measure:
+    """ Wall and CPU time of a scenario, CPU split between client and server """
+
+    def __init__(self, server):
+        self.server = server
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.serverCpu = self.server.cpu
+        return self
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self.wall
+        serverCpu = self.server.cpu - self.serverCpu
+        self.clientCpu = time.process_time() - self.cpu - serverCpu
+        self.serverCpu = serverCpu
+
+
+def timed(function, count):
+    """ Call function(i) count times, return the latencies in seconds """
+    latencies = np.empty(count)
+    for i in range(count):
+        started = time.perf_counter()
+        function(i)
+        latencies[i] = time.perf_counter() - started
+    return latencies
+
+
+def switchScenario(server, telescope, client, device, args):
+    modes = ['TRACK', 'SLEW']
+    return timed(lambda i: device.set_switch('ON_COORD_SET', [modes[i % 2]], timeout=5), args.count)
+
+
+def numberScenario(server, telescope, client, device, args):
+    return timed(lambda i: device.set_number('GEOGRAPHIC_COORD', {'LAT': i % 90}, timeout=5), args.count)
+
+
+def concurrentScenario(server, telescope, client, device, args):
+    # driver state belongs to the server thread
+    server.schedule(0, telescope.track, args.flood)
+    results = [None] * args.threads
+    count = max(1, args.count // args.threads)
+
+    def worker(k):
+        name = 'BENCH_%d' % k
+        results[k] = timed(lambda i: device.set_number(name, {'VALUE': i}, timeout=5), count)
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    server.schedule(0, telescope.track, 0.0)
+    return np.concatenate(results)
+
+
+def slewScenario(server, telescope, client, device, args):
+    device.set_switch('ON_COORD_SET', ['SLEW'], timeout=5)
+    distances = [10, 30, 60, 90]
+
+    def goto(i):
+        ra, dec = telescope.position()
+        dec = dec - distances[i % len(distances)] if dec > 0 else dec + distances[i % len(distances)]
+        device.set_number('EQUATORIAL_EOD_COORD', {'RA': ra / 15, 'DEC': dec}, timeout=120)
+    latencies = timed(goto, len(distances))
+    device.set_switch('ON_COORD_SET', ['TRACK'], timeout=5)
+    return latencies
+
+
+SCENARIOS = {
+    'switch': switchScenario,
+    'number': numberScenario,
+    'concurrent': concurrentScenario,
+    'slew': slewScenario,
+}
+
+
+def histogram(latencies):
+    """ Print the latencies (ms) per bucket """
+    counts, bounds = [], [0] + BUCKETS
+    for low, high in zip(bounds, bounds[1:]):
+        counts.append(int(((latencies > low) & (latencies <= high)).sum()))
+    # drop the empty buckets at both ends
+    first = next((i for i, c in enumerate(counts) if c), 0)
+    last = max((i for i, c in enumerate(counts) if c), default=0)
+    top = max(counts) or 1
+    for i in range(first, last + 1):
+        label = '> %g' % bounds[i] if BUCKETS[i] == float('inf') else '<= %g' % BUCKETS[i]
+        print('  %10s ms %7d %s' % (label, counts[i], '#' * round(counts[i] * BAR / top)))
+    return dict(zip(['%g' % b for b in BUCKETS], counts))
+
+
+def report(name, latencies, measure, updates):
+    latencies = latencies * 1000
+    stats = {
+        'operations': len(latencies),
+        'throughput': len(latencies) / measure.wall,
+        'mean': float(latencies.mean()),
+        'p50': float(np.percentile(latencies, 50)),
+        'p90': float(np.percentile(latencies, 90)),
+        'p99': float(np.percentile(latencies, 99)),
+        'max': float(latencies.max()),
+        'client_cpu': measure.clientCpu,
+        'server_cpu': measure.serverCpu,
+        'client_cpu_per_op_us': measure.clientCpu / len(latencies) * 1e6,
+        'updates': updates,
+    }
+    print()
+    print('%s: %d operations in %.2f s, %.0f ops/s, %d property updates received' % (
+        name, stats['operations'], measure.wall, stats['throughput'], updates))
+    print('  latency mean %.3f ms, p50 %.3f ms, p90 %.3f ms, p99 %.3f ms, max %.3f ms' % (
+        stats['mean'], stats['p50'], stats['p90'], stats['p99'], stats['max']))
+    print('  client CPU %.2f s (%.0f%% of one core, %.1f µs per operation), server CPU %.2f s' % (
+        measure.clientCpu, 100 * measure.clientCpu / measure.wall,
+        stats['client_cpu_per_op_us'], measure.serverCpu))
+    stats['histogram'] = histogram(latencies)
+    return stats
+
+
+def received(client):
+    return sum(total for device, name, total, rate in client.stats.rates())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--count', type=int, default=2000, help='round trips per scenario')
+    parser.add_argument('--latency', type=float, default=0.0, help='one way latency, seconds')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--flood', type=float, default=200.0,
+                        help='position updates per second during the concurrent scenario')
+    parser.add_argument('--slew-rate', type=float, default=30.0, help='degrees per second')
+    parser.add_argument('--only', help='comma separated list of scenarios')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    args = parser.parse_args()
+
+    server, telescope, client, device = start(args)
+    selected = args.only.split(',') if args.only else list(SCENARIOS)
+    results = {}
+    try:
+        for name in selected:
+            before = received(client)
+            with Measure(server) as measure:
+                latencies = SCENARIOS[name](server, telescope, client, device, args)
+            results[name] = report(name, latencies, measure, received(client) - before)
+    finally:
+        client.disconnectServer()
+        server.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'latency': args.latency,
+                'threads': args.threads,
+                'flood': args.flood,
+                'slew_rate': args.slew_rate,
+                'results': results,
+            }, f, indent=2)
+        print('Results saved to', args.output)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Per-resolve latency of resolver.resolv, with a cold ephemeris context on
+every call (the old behaviour) and with the shared process-wide context.
+
+Usage: python bench/bench_resolve.py [target] [runs]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ephemeris import Ephemeris  # noqa: E402
+from resolver import resolv  # noqa: E402
+
+pos = {'lat': 44.6979389, 'lon': 6.9067861, 'elev': 2900}
+
+
+def run(target, runs, cold):
+    timings = []
+    for i in range(runs):
+        if cold:
+            Ephemeris.reset()
+        r = resolv(target)
+        r.setPosFromDict(pos)
+        # keep the resolver chatter out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            r.resolve()
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings
+
+
+def report(label, timings):
+    mean = sum(timings) / len(timings)
+    print('%-8s mean %8.2f ms   median %8.2f ms   min %8.2f ms' % (
+        label,
+        mean * 1000,
+        timings[len(timings) // 2] * 1000,
+        timings[0] * 1000
+    ))
+
+
+if __name__ == '__main__':
+    target = sys.argv[1] if len(sys.argv) > 1 else 'Jupiter'
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print('Resolving', target, runs, 'times')
+    report('before', run(target, runs, cold=True))
+    # first call pays the load, keep it out of the steady-state figures
+    Ephemeris.reset()
+    run(target, 1, cold=False)
+    report('after', run(target, runs, cold=False))
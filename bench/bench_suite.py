@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+"""
+Latency and memory of the resolver and goto paths, offline, against the
+small catalogues of bench/fixtures (same formats as the real BSC5P JSON,
+NGC/IC/Messier JSON and Hipparcos hip_main.dat).
+
+Every path is timed runs times after one untimed call (whose time is
+reported as 'first': it builds the indexes), then run once more under
+tracemalloc for its peak memory. The paths that need the planetary
+ephemeris are skipped when de421.bsp isn't in the Skyfield data directory,
+nothing is downloaded.
+
+Results can be saved as JSON and compared with a previous run: a path
+whose median got slower than threshold times the old one is reported as a
+regression and the exit status is 1.
+
+Usage: python bench/bench_suite.py [--runs N] [--only path,...]
+                                   [--output results.json]
+                                   [--compare old.json] [--threshold 1.2]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+import numpy as np  # noqa: E402
+import getPosFromBSC5P  # noqa: E402
+import getPosFromMessier  # noqa: E402
+from ephemeris import DATA_DIR, EPHEMERIS  # noqa: E402
+from hipStore import HipStore  # noqa: E402
+
+FIXTURES = os.path.join(HERE, 'fixtures')
+
+pos = {'lat': 44.6979389, 'lon': 6.9067861, 'elev': 2900, 'name': 'Saint-Véran'}
+
+# targets of the batch resolve, every kind of object of the fixtures
+BATCH = ['Jupiter', 'MOON', '* alf And', '* alf Lyr', 'HIP32349', 'HIP24436',
+         'M31', 'M42', 'M13', 'NGC7000', 'IC1396', 'M57'] * 4
+
+
+def setup(workdir):
+    """ Point the catalogues at copies of the fixtures in workdir """
+    for name in os.listdir(FIXTURES):
+        shutil.copy(os.path.join(FIXTURES, name), workdir)
+    getPosFromBSC5P.DATASOURCE = os.path.join(workdir, 'bsc5p.json')
+    getPosFromMessier.DATASOURCE = os.path.join(workdir, 'ngc.json')
+    HipStore._instance = HipStore(
+        os.path.join(workdir, 'hip_store'),
+        source=os.path.join(workdir, 'hip_main.dat')
+    )
+
+
+def hasEphemeris():
+    return os.path.exists(os.path.join(os.path.expanduser(DATA_DIR), EPHEMERIS))
+
+
+def resolver(target):
+    from resolver import resolv
+
+    def run():
+        r = resolv(target)
+        r.setPosFromDict(pos)
+        return r.resolve()
+    return run
+
+
+def paths():
+    """ Return {name: (needs the ephemeris, function to time)} """
+    from resolver import resolv
+    from coords import Coords, CoordArray
+    from precession import toDate
+    from nameIndex import NameIndex
+    from skyIndex import SkyIndex
+    from astropy.coordinates import SkyCoord, FK5
+    import astropy.units as u
+
+    r = resolv('')
+    r.setPosFromDict(pos)
+    rng = np.random.default_rng(0)
+    ra = rng.uniform(0, 360, 1000)
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, 1000)))
+    target = {'ra': 10.68, 'dec': 41.27}
+
+    def altaz(engine):
+        def run():
+            resolv.altazEngine = engine
+            try:
+                return r.getAltAz(target)
+            finally:
+                resolv.altazEngine = 'native'
+        return run
+
+    def coords():
+        c = Coords(10.6847, 41.2690)
+        return c.ra_hms, c.dec_dms
+
+    def fk5():
+        # what do_goto used to do
+        c = SkyCoord(10.68, 41.27, unit=u.deg, frame='icrs').transform_to(FK5(equinox='J2024'))
+        return c.ra.deg, c.dec.deg
+
+    return {
+        'planet': (True, resolver('Jupiter')),
+        'moon': (True, resolver('MOON')),
+        'bayer': (True, resolver('* alf And')),
+        'hip': (True, resolver('HIP91262')),
+        'messier': (True, resolver('M31')),
+        'ngc': (True, resolver('NGC7000')),
+        'ic': (True, resolver('IC1396')),
+        'resolve_many': (True, lambda: r.resolve_many(BATCH)),
+        'bsc5p_lookup': (False, lambda: getPosFromBSC5P.BSC5P().getHipFromBayer('* alf Lyr')),
+        'messier_lookup': (False, lambda: getPosFromMessier.Messier().getPosFromRef('M42', 'm')),
+        'hip_star': (False, lambda: HipStore.get().star(91262)),
+        'altaz_native': (False, altaz('native')),
+        'altaz_astropy': (False, altaz('astropy')),
+        'coords': (False, coords),
+        'coords_array': (False, lambda: CoordArray(ra, dec).getCoordsStrings()),
+        'fk5_j2024': (False, fk5),
+        'to_date': (False, lambda: toDate(10.68, 41.27)),
+        'to_date_array': (False, lambda: toDate(ra, dec)),
+        'name_complete': (False, lambda: NameIndex.get().complete('al')),
+        'name_suggest': (False, lambda: NameIndex.get().suggest('Andromeda Galxy')),
+        'cone': (False, lambda: SkyIndex.get().cone(10.68, 41.27, 5.0)),
+    }
+
+
+def measure(function, runs):
+    """ Return the statistics of a path, times in milliseconds """
+    # the resolver chatter stays out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        function()
+        first = time.perf_counter() - started
+        timings = []
+        for i in range(runs):
+            started = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    timings = np.array(timings) * 1000
+    return {
+        'first': first * 1000,
+        'mean': float(timings.mean()),
+        'p50': float(np.percentile(timings, 50)),
+        'p90': float(np.percentile(timings, 90)),
+        'p99': float(np.percentile(timings, 99)),
+        'max': float(timings.max()),
+        'peak_kib': peak / 1024,
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, old, threshold):
+    """ Print the median of each path against an older run, return the regressions """
+    regressions = []
+    print()
+    print('%-16s %10s %10s %8s' % ('compared with', old.get('commit') or '?', 'now', 'ratio'))
+    for name, stats in results.items():
+        before = old['results'].get(name)
+        if before is None:
+            continue
+        ratio = stats['p50'] / before['p50'] if before['p50'] else float('inf')
+        flag = ''
+        if ratio > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print('%-16s %8.3f ms %8.3f ms %7.2fx%s' % (name, before['p50'], stats['p50'], ratio, flag))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--only', help='comma separated list of paths')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of a previous run')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='median slowdown reported as a regression')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='goto-bench-')
+    try:
+        setup(workdir)
+        ephemeris = hasEphemeris()
+        if not ephemeris:
+            print('No', EPHEMERIS, 'in', DATA_DIR, '- skipping the paths that need it')
+        selected = args.only.split(',') if args.only else None
+
+        results = {}
+        print('%-16s %9s %9s %9s %9s %9s %10s' % ('path', 'first', 'p50', 'p90', 'p99', 'max', 'peak'))
+        for name, (needsEphemeris, function) in paths().items():
+            if selected and name not in selected:
+                continue
+            if needsEphemeris and not ephemeris:
+                continue
+            stats = results[name] = measure(function, args.runs)
+            print('%-16s %6.3f ms %6.3f ms %6.3f ms %6.3f ms %6.3f ms %7.1f KiB' % (
+                name, stats['first'], stats['p50'], stats['p90'], stats['p99'],
+                stats['max'], stats['peak_kib']))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'commit': commit(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'runs': args.runs,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print('Results saved to', args.output)
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        if compare(results, old, args.threshold):
+            sys.exit(1)
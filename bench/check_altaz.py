@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""
+Accuracy and speed of the native alt/az engine (altaz.py) against astropy,
+for random J2000 positions seen from every observatory of config.ini.
+Exits with an error if the native engine is off by more than
+altaz.TOLERANCE degrees (objects within 5° of the horizon are left out of
+the refraction comparison, where both models diverge).
+
+Then the alt/az computed by resolv.resolve() for planets and stars (the
+stars of bench/fixtures) is compared, for both engines, with the one of
+Skyfield for the same apparent position, within RESOLVE_TOLERANCE
+arcseconds. Skipped when de421.bsp isn't in the Skyfield data directory.
+
+Usage: python bench/check_altaz.py [count]
+"""
+
+import configparser
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import altaz  # noqa: E402
+from astropy.coordinates import EarthLocation, SkyCoord, AltAz  # noqa: E402
+from astropy.time import Time  # noqa: E402
+import astropy.units as u  # noqa: E402
+
+# arcseconds, per engine of resolv.getAltAz: the native engine is within a
+# few arcseconds, astropy applies the aberration a second time to the
+# apparent place (about 20"). Mixing up J2000 and date axes costs 180" and more.
+RESOLVE_TOLERANCE = {'native': 15.0, 'astropy': 30.0}
+RESOLVE_TARGETS = ['MOON', 'SUN', 'MARS', 'JUPITER', '* alf Lyr', '* alf UMi', 'HIP32349']
+
+
+def sites():
+    cfg = configparser.ConfigParser()
+    cfg.read(os.path.join(os.path.dirname(__file__), '..', 'config.ini'))
+    for section in cfg.sections():
+        if section.startswith('OBS'):
+            yield cfg.get(section, 'name'), cfg.getfloat(section, 'lat'), \
+                cfg.getfloat(section, 'lon'), cfg.getfloat(section, 'elev')
+
+
+def errors(alt1, az1, alt2, az2):
+    dAlt = np.abs(alt1 - alt2)
+    # azimuth error on the sky, not in azimuth degrees near the zenith
+    dAz = np.abs((az1 - az2 + 180) % 360 - 180) * np.cos(np.radians(alt1))
+    return dAlt.max(), dAz.max()
+
+
+def checkResolve():
+    """
+    Compare the alt/az of resolv.resolve() with Skyfield's, return False
+    if an engine is off by more than RESOLVE_TOLERANCE
+    """
+    from bench_suite import setup, hasEphemeris
+    from resolver import resolv, planets
+    from ephemeris import Ephemeris
+    from hipStore import HipStore
+    from getPosFromBSC5P import BSC5P
+
+    if not hasEphemeris():
+        print('No de421.bsp, resolve() not checked')
+        return True
+
+    class Recorder(resolv):
+        """ Keeps the alt/az resolve() computes """
+        def getAltAz(self, target):
+            self.altaz = super().getAltAz(target)
+            return self.altaz
+
+    workdir = tempfile.mkdtemp(prefix='goto-check-')
+    ok = True
+    try:
+        setup(workdir)
+        eph = Ephemeris.get()
+        for name, lat, lon, elev in sites():
+            pos = {'lat': lat, 'lon': lon, 'elev': elev}
+            worst = {}
+            for engine in RESOLVE_TOLERANCE:
+                Recorder.altazEngine = engine
+                worst[engine] = 0.0
+                for target in RESOLVE_TARGETS:
+                    r = Recorder(target)
+                    r.setPosFromDict(pos)
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        r.resolve()
+                    if target.upper() in planets:
+                        body = eph.body(target)
+                    else:
+                        hipID = int(target[3:]) if target.startswith('HIP') \
+                            else BSC5P().getHipFromBayer(target)
+                        body = HipStore.get().star(hipID)
+                    alt, az, distance = eph.observer(pos).at(r.t).observe(body).apparent().altaz()
+                    dAlt, dAz = errors(alt.degrees, az.degrees, *r.altaz)
+                    worst[engine] = max(worst[engine], dAlt * 3600, dAz * 3600)
+                if worst[engine] > RESOLVE_TOLERANCE[engine]:
+                    ok = False
+            print('%-24s resolve() alt/az: %s' % (name, ', '.join(
+                '%s %.1f"' % (engine, error) for engine, error in worst.items())))
+    finally:
+        Recorder.altazEngine = 'native'
+        shutil.rmtree(workdir, ignore_errors=True)
+    return ok
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = np.random.default_rng(0)
+    ra = rng.uniform(0, 360, count)
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, count)))
+    t = Time.now()
+    failed = False
+
+    for name, lat, lon, elev in sites():
+        location = EarthLocation(lat=lat*u.deg, lon=lon*u.deg, height=elev*u.m)
+        coord = SkyCoord(ra=ra*u.deg, dec=dec*u.deg)
+
+        started = time.perf_counter()
+        ref = coord.transform_to(AltAz(location=location, obstime=t))
+        astropyTime = time.perf_counter() - started
+        started = time.perf_counter()
+        alt, az = altaz.radec2altaz(ra, dec, lat, lon, jd=t.utc.jd, j2000=True)
+        nativeTime = time.perf_counter() - started
+        dAlt, dAz = errors(ref.alt.deg, ref.az.deg, alt, az)
+
+        refracted = coord.transform_to(AltAz(
+            location=location,
+            obstime=t,
+            pressure=altaz.PRESSURE*u.hPa,
+            temperature=altaz.TEMPERATURE*u.deg_C,
+            relative_humidity=0,
+            obswl=0.55*u.micron
+        ))
+        rAlt, rAz = altaz.radec2altaz(ra, dec, lat, lon, jd=t.utc.jd, j2000=True, refract=True)
+        high = refracted.alt.deg > 5
+        dRefr = np.abs(refracted.alt.deg - rAlt)[high].max()
+
+        print('%-24s alt %.4f° az %.4f° refracted alt %.4f°   astropy %7.1f ms native %6.2f ms' % (
+            name, dAlt, dAz, dRefr, astropyTime * 1000, nativeTime * 1000))
+        if max(dAlt, dAz, dRefr) > altaz.TOLERANCE:
+            failed = True
+
+    if failed:
+        print('FAILED: native engine off by more than', altaz.TOLERANCE, 'degrees')
+        sys.exit(1)
+    print('OK: native engine within', altaz.TOLERANCE, 'degrees of astropy')
+
+    if not checkResolve():
+        print('FAILED: resolve() alt/az off by more than', RESOLVE_TOLERANCE, 'arcseconds')
+        sys.exit(1)
+    print('OK: resolve() alt/az within', RESOLVE_TOLERANCE, 'arcseconds of Skyfield')
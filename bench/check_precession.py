@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Accuracy and speed of the J2000 to equinox of date conversion
+(precession.py) against astropy and ERFA, for random positions:
+- toDate (precession + nutation) against the IAU 1976/1980 matrix of ERFA
+- precess (precession only) against astropy's FK5 of the date
+- the drift of a cached matrix over VALIDITY days
+and against the FK5 J2024 transform goto used to do.
+Exits with an error if toDate is off by more than TOLERANCE arcseconds.
+
+Usage: python bench/check_precession.py [count]
+"""
+
+import os
+import sys
+import time
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import precession  # noqa: E402
+import erfa  # noqa: E402
+from astropy.coordinates import SkyCoord, FK5  # noqa: E402
+from astropy.time import Time  # noqa: E402
+import astropy.units as u  # noqa: E402
+
+# arcseconds
+TOLERANCE = 1.0
+
+
+def separation(ra1, dec1, ra2, dec2):
+    """ Angular separation in arcseconds, positions in degrees """
+    ra1, dec1, ra2, dec2 = map(np.radians, (ra1, dec1, ra2, dec2))
+    h = np.sin((dec2 - dec1) / 2) ** 2 + \
+        np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1) / 2) ** 2
+    return np.degrees(2 * np.arcsin(np.sqrt(h))) * 3600
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = np.random.default_rng(0)
+    ra = rng.uniform(0, 360, count)
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, count)))
+    failed = False
+    # dates past the leap second table are 'dubious' for ERFA, harmless here
+    warnings.simplefilter('ignore', erfa.ErfaWarning)
+
+    for year in (2024, 2026, 2035):
+        t = Time('%d-06-01T00:00:00' % year, scale='utc')
+        jd = t.utc.jd
+        precession._cache.clear()
+
+        # precession and nutation against ERFA
+        raDate, decDate = precession.toDate(ra, dec, jd)
+        refRa, refDec = precession.rotate(erfa.pnm80(t.tt.jd1, t.tt.jd2), ra, dec)
+        dFull = separation(raDate, decDate, refRa, refDec).max()
+
+        # precession only against astropy
+        pRa, pDec = precession.precess(ra, dec, jd)
+        fk5 = SkyCoord(ra=ra*u.deg, dec=dec*u.deg, frame='icrs').transform_to(FK5(equinox=t))
+        dMean = separation(pRa, pDec, fk5.ra.deg, fk5.dec.deg).max()
+
+        # drift of the cached matrix
+        later = precession.rotate(
+            precession.nutationMatrix(jd + precession.VALIDITY) @
+            precession.precessionMatrix(jd + precession.VALIDITY), ra, dec)
+        dCache = separation(raDate, decDate, *later).max()
+
+        # what the hard-coded J2024 equinox costs
+        old = SkyCoord(ra=ra*u.deg, dec=dec*u.deg, frame='icrs').transform_to(FK5(equinox='J2024'))
+        dOld = separation(old.ra.deg, old.dec.deg, refRa, refDec).max()
+
+        print('%d  toDate %.3f"  precess %.3f"  cache drift %.3f"  FK5 J2024 %.1f"' % (
+            year, dFull, dMean, dCache, dOld))
+        if dFull > TOLERANCE:
+            failed = True
+
+    # speed of one conversion, as done by goto, and of a whole array
+    started = time.perf_counter()
+    for i in range(20):
+        c = SkyCoord(ra[i], dec[i], unit=u.deg, frame='icrs').transform_to(FK5(equinox='J2024'))
+    astropyTime = (time.perf_counter() - started) / 20
+    started = time.perf_counter()
+    for i in range(1000):
+        precession.toDate(ra[i], dec[i])
+    nativeTime = (time.perf_counter() - started) / 1000
+    started = time.perf_counter()
+    precession.toDate(ra, dec)
+    arrayTime = time.perf_counter() - started
+    print('one position: astropy %.2f ms, toDate %.1f µs; %d positions: toDate %.2f ms' % (
+        astropyTime * 1000, nativeTime * 1e6, count, arrayTime * 1000))
+
+    if failed:
+        print('FAILED: toDate off by more than', TOLERANCE, 'arcseconds')
+        sys.exit(1)
+    print('OK: toDate within', TOLERANCE, 'arcseconds of ERFA')
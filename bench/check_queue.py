@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Check the session queue planner (sessionQueue.py) on the fixture
+catalogues of bench/fixtures:
+- proper and common names (Vega, Polaris, Andromeda Galaxy) resolve as
+  goto resolves them, through the name index
+- every planned target is above the minimum altitude when reached and
+  doesn't cross the meridian during its dwell
+Exits with an error if a check fails.
+
+Usage: python bench/check_queue.py
+"""
+
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+import numpy as np  # noqa: E402
+import bench_suite  # noqa: E402
+from precession import precess  # noqa: E402
+from sessionQueue import SessionQueue, crossesMeridian, hourAngle  # noqa: E402
+
+# target -> resolver target it must be planned as
+NAMES = {
+    'Vega': '* alf Lyr',
+    'Polaris': '* alf UMi',
+    'Andromeda Galaxy': 'M31',
+    'M57': 'M57',
+}
+# Julian date of the plan, 2026-11-15 21:00 UTC
+JD = 2461360.375
+MIN_ALT = 10.0
+
+
+def checkNames():
+    """ A queue of names plans the same positions as their resolver targets """
+    queue, reference = SessionQueue(), SessionQueue()
+    for name, target in NAMES.items():
+        queue.add(name)
+        reference.add(target)
+    steps, skipped = queue.plan(bench_suite.pos, minAlt=-90, jd=JD)
+    expected, skippedRef = reference.plan(bench_suite.pos, minAlt=-90, jd=JD)
+    failed = False
+    for entry, reason in skipped:
+        print('FAILED:', entry.name, reason)
+        failed = True
+    planned = {s.entry.name: (s.ra, s.dec) for s in steps}
+    for s in expected:
+        name = next(n for n, t in NAMES.items() if t == s.entry.name)
+        if name in planned and not np.allclose(planned[name], (s.ra, s.dec), atol=1e-6):
+            print('FAILED:', name, 'planned at', planned[name], 'instead of', (s.ra, s.dec))
+            failed = True
+    print('names: %d/%d planned' % (len(steps), len(NAMES)))
+    return failed
+
+
+def checkSchedule():
+    """ Planned targets are high enough and stay on one side of the meridian """
+    queue = SessionQueue()
+    for name in ['M31', 'M57', 'M13', 'M27', 'Vega', 'Polaris', 'NGC7000', 'M81', 'M51', 'M42']:
+        queue.add(name, 1800)
+    steps, skipped = queue.plan(bench_suite.pos, minAlt=MIN_ALT, jd=JD)
+    lon = bench_suite.pos['lon']
+    failed = False
+    for step in steps:
+        end = step.arrival + step.entry.dwell / 86400.0
+        ra, dec = precess(np.array([step.ra]), np.array([step.dec]), step.arrival)
+        if step.alt < MIN_ALT:
+            print('FAILED:', step.entry.name, 'at %.1f°' % step.alt)
+            failed = True
+        if crossesMeridian(ra, lon, np.array([step.arrival]), np.array([end]))[0]:
+            print('FAILED:', step.entry.name, 'crosses the meridian, hour angle %.1f°' % float(
+                hourAngle(ra[0], lon, step.arrival)))
+            failed = True
+    print('schedule: %d planned, %d skipped (%s)' % (
+        len(steps), len(skipped), ', '.join('%s: %s' % (e.name, r) for e, r in skipped)))
+    return failed
+
+
+if __name__ == '__main__':
+    if not bench_suite.hasEphemeris():
+        print('The ephemeris is needed, run goto once to download it')
+        sys.exit(1)
+    bench_suite.setup(tempfile.mkdtemp())
+    failed = checkNames()
+    failed = checkSchedule() or failed
+    if failed:
+        sys.exit(1)
+    print('OK')
@@ -0,0 +1,595 @@
+"""
+In-process stand-in for PyIndi and an INDI server, to run and profile
+IndiClient, Device and the CLI without indiserver or hardware.
+
+The module has the PyIndi surface the code uses (BaseClient, BaseDevice,
+properties with both the vector API of Device and the PyIndi 2 accessors,
+PropertyNumber/Switch/Text/Light and the constants). install() registers it
+as the PyIndi module, so it must run before indiClient, device or
+propertyMirror are imported (from outside bench/, add bench/ to sys.path):
+
+    import fakeIndi
+    server = fakeIndi.install(latency=0.001)
+    server.addDriver(fakeIndi.Telescope('Telescope Simulator', slewRate=3.0))
+    import indiClient
+    client = indiClient.IndiClient()
+    client.setServer('localhost', 7624)
+    client.connectServer()
+
+The server runs one thread, like the PyIndi listener thread: every client
+callback is made from it. Requests reach the drivers, and their updates
+reach the clients, latency seconds after being sent.
+"""
+
+import heapq
+import itertools
+import sys
+import threading
+import time
+
+IPS_IDLE, IPS_OK, IPS_BUSY, IPS_ALERT = range(4)
+ISS_OFF, ISS_ON = range(2)
+ISR_1OFMANY, ISR_ATMOST1, ISR_NOFMANY = range(3)
+INDI_NUMBER, INDI_SWITCH, INDI_TEXT, INDI_LIGHT, INDI_BLOB, INDI_UNKNOWN = range(6)
+IP_RO, IP_WO, IP_RW = range(3)
+
+TYPE_NAMES = {
+    INDI_NUMBER: 'INDI_NUMBER', INDI_SWITCH: 'INDI_SWITCH', INDI_TEXT: 'INDI_TEXT',
+    INDI_LIGHT: 'INDI_LIGHT', INDI_BLOB: 'INDI_BLOB', INDI_UNKNOWN: 'INDI_UNKNOWN'
+}
+
+# running servers by (host, port), connectServer looks them up here
+servers = {}
+
+
+class Widget:
+    """ An element of a property, with the attributes of both PyIndi APIs """
+
+    def __init__(self, name, label=None, value=0.0, min=0.0, max=0.0, step=0.0,
+                 format='%g', s=ISS_OFF, text=''):
+        self.name = name
+        self.label = label or name
+        self.value = value
+        self.min = min
+        self.max = max
+        self.step = step
+        self.format = format
+        self.s = s
+        self.text = text
+
+    def getName(self):
+        return self.name
+
+    def getLabel(self):
+        return self.label
+
+    def getValue(self):
+        return self.value
+
+    def setValue(self, value):
+        self.value = value
+
+    def getMin(self):
+        return self.min
+
+    def getMax(self):
+        return self.max
+
+    def getStep(self):
+        return self.step
+
+    def getFormat(self):
+        return self.format
+
+    def getState(self):
+        return self.s
+
+    def setState(self, state):
+        self.s = state
+
+    def getText(self):
+        return self.text
+
+    def setText(self, text):
+        self.text = text
+
+    def copy(self):
+        return Widget(self.name, self.label, self.value, self.min, self.max,
+                      self.step, self.format, self.s, self.text)
+
+
+class Property:
+    """ A property vector: iterable over its widgets, s is its state """
+
+    def __init__(self, device, name, type, widgets, label=None, group='Main Control',
+                 perm=IP_RW, rule=ISR_1OFMANY, state=IPS_IDLE):
+        self.device = device
+        self.name = name
+        self.type = type
+        self.widgets = list(widgets)
+        self.label = label or name
+        self.group = group
+        self.p = perm
+        self.r = rule
+        self.s = state
+
+    def getName(self):
+        return self.name
+
+    def getLabel(self):
+        return self.label
+
+    def getGroupName(self):
+        return self.group
+
+    def getDeviceName(self):
+        return self.device
+
+    def getType(self):
+        return self.type
+
+    def getTypeAsString(self):
+        return TYPE_NAMES[self.type]
+
+    def getState(self):
+        return self.s
+
+    def setState(self, state):
+        self.s = state
+
+    def getPermission(self):
+        return self.p
+
+    def getRule(self):
+        return self.r
+
+    def isValid(self):
+        return True
+
+    def reset(self):
+        """ Turn every switch off """
+        for w in self.widgets:
+            w.s = ISS_OFF
+
+    def find(self, name):
+        return next((w for w in self.widgets if w.name == name), None)
+
+    def __len__(self):
+        return len(self.widgets)
+
+    def __getitem__(self, index):
+        return self.widgets[index]
+
+    def __iter__(self):
+        return iter(self.widgets)
+
+    def __bool__(self):
+        return True
+
+    def copy(self):
+        return Property(self.device, self.name, self.type, [w.copy() for w in self.widgets],
+                        self.label, self.group, self.p, self.r, self.s)
+
+    def assign(self, other):
+        """ Take the state and the widget values of other """
+        self.s = other.s
+        for mine, theirs in zip(self.widgets, other.widgets):
+            mine.value, mine.s, mine.text = theirs.value, theirs.s, theirs.text
+
+
+# the typed views of PyIndi 2 are the property itself here
+def PropertyNumber(p):
+    return p
+
+
+PropertySwitch = PropertyText = PropertyLight = PropertyNumber
+
+
+def number(device, name, widgets, **kwargs):
+    """ A number property from (name, value, min, max) tuples """
+    return Property(device, name, INDI_NUMBER, [
+        Widget(n, value=v, min=lo, max=hi, format='%010.6m') for n, v, lo, hi in widgets
+    ], **kwargs)
+
+
+def switch(device, name, widgets, **kwargs):
+    """ A switch property from (name, on) tuples """
+    return Property(device, name, INDI_SWITCH, [
+        Widget(n, s=ISS_ON if on else ISS_OFF) for n, on in widgets
+    ], **kwargs)
+
+
+def text(device, name, widgets, **kwargs):
+    """ A text property from (name, text) tuples """
+    return Property(device, name, INDI_TEXT, [Widget(n, text=t) for n, t in widgets], **kwargs)
+
+
+class BaseDevice:
+    GENERAL_INTERFACE = 0
+    TELESCOPE_INTERFACE = 1 << 0
+    CCD_INTERFACE = 1 << 1
+    GUIDER_INTERFACE = 1 << 2
+    FOCUSER_INTERFACE = 1 << 3
+    FILTER_INTERFACE = 1 << 4
+    DOME_INTERFACE = 1 << 5
+    GPS_INTERFACE = 1 << 6
+    WEATHER_INTERFACE = 1 << 7
+    AO_INTERFACE = 1 << 8
+    DUSTCAP_INTERFACE = 1 << 9
+    LIGHTBOX_INTERFACE = 1 << 10
+    DETECTOR_INTERFACE = 1 << 11
+    ROTATOR_INTERFACE = 1 << 12
+    AUX_INTERFACE = 1 << 15
+
+    def __init__(self, name, interface=GENERAL_INTERFACE):
+        self.name = name
+        self.interface = interface
+        self.properties = {}
+        self.messages = []
+
+    def getDeviceName(self):
+        return self.name
+
+    def isConnected(self):
+        connection = self.properties.get('CONNECTION')
+        return connection is not None and connection.find('CONNECT').s == ISS_ON
+
+    def getDriverInterface(self):
+        return self.interface
+
+    def getProperties(self):
+        return list(self.properties.values())
+
+    def getProperty(self, name):
+        return self.properties.get(name)
+
+    def __typed(self, name, type):
+        p = self.properties.get(name)
+        return p if p is not None and p.type == type else None
+
+    def getNumber(self, name):
+        return self.__typed(name, INDI_NUMBER)
+
+    def getSwitch(self, name):
+        return self.__typed(name, INDI_SWITCH)
+
+    def getText(self, name):
+        return self.__typed(name, INDI_TEXT)
+
+    def getLight(self, name):
+        return self.__typed(name, INDI_LIGHT)
+
+    def getBLOB(self, name):
+        return self.__typed(name, INDI_BLOB)
+
+    def messageQueue(self, index):
+        return self.messages[index]
+
+
+class BaseClient:
+    """ The client side: a copy of the devices, updated by the server thread """
+
+    def __init__(self):
+        self.__host = 'localhost'
+        self.__port = 7624
+        self.__server = None
+        self.__devices = {}
+
+    def setServer(self, host, port):
+        self.__host, self.__port = host, port
+
+    def getHost(self):
+        return self.__host
+
+    def getPort(self):
+        return self.__port
+
+    def connectServer(self):
+        server = servers.get((self.__host, self.__port))
+        if server is None:
+            return False
+        self.__server = server
+        server.attach(self)
+        return True
+
+    def disconnectServer(self, exit_code=0):
+        server, self.__server = self.__server, None
+        if server is not None:
+            server.detach(self, exit_code)
+        return True
+
+    def isServerConnected(self):
+        return self.__server is not None
+
+    def watchDevice(self, name):
+        pass
+
+    def setBLOBMode(self, mode, device, prop=None):
+        pass
+
+    def getDevices(self):
+        return list(self.__devices.values())
+
+    def getDevice(self, name):
+        return self.__devices.get(name)
+
+    def sendNewProperty(self, p):
+        if self.__server is None:
+            return
+        # as INDI does, the local copy is busy until the driver answers
+        p.s = IPS_BUSY
+        self.__server.submit(p.device, p.name, p.copy())
+
+    sendNewNumber = sendNewSwitch = sendNewText = sendNewProperty
+
+    # called from the server thread
+    def _define(self, device, interface, prop):
+        d = self.__devices.get(device)
+        if d is None:
+            d = self.__devices[device] = BaseDevice(device, interface)
+            self.newDevice(d)
+        p = d.properties[prop.name] = prop.copy()
+        self.newProperty(p)
+
+    def _update(self, prop):
+        d = self.__devices.get(prop.device)
+        p = d.properties.get(prop.name) if d is not None else None
+        if p is None:
+            return
+        p.assign(prop)
+        self.updateProperty(p)
+
+    def _forget(self):
+        self.__devices = {}
+
+    # callbacks, overridden by the client
+    def newDevice(self, d):
+        pass
+
+    def removeDevice(self, d):
+        pass
+
+    def newProperty(self, p):
+        pass
+
+    def updateProperty(self, p):
+        pass
+
+    def removeProperty(self, p):
+        pass
+
+    def newMessage(self, d, m):
+        pass
+
+    def serverConnected(self):
+        pass
+
+    def serverDisconnected(self, code):
+        pass
+
+
+class FakeServer:
+    """
+    Event loop standing for indiserver, its drivers and the network: events
+    are run in time order on one thread.
+    """
+
+    def __init__(self, host='localhost', port=7624, latency=0.0):
+        self.host, self.port = host, port
+        self.latency = latency
+        self.drivers = {}
+        self.clients = []
+        self.__events = []
+        self.__sequence = itertools.count()
+        self.__condition = threading.Condition()
+        self.__thread = None
+        self.__running = False
+        # CPU time used by the server thread, seconds
+        self.cpu = 0.0
+        self.delivered = 0
+
+    def start(self):
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run, name='fakeIndi', daemon=True)
+        self.__thread.start()
+        servers[(self.host, self.port)] = self
+        return self
+
+    def stop(self):
+        servers.pop((self.host, self.port), None)
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify()
+        self.__thread.join()
+
+    def schedule(self, delay, function, *args):
+        """ Run function(*args) on the server thread in delay seconds """
+        with self.__condition:
+            heapq.heappush(self.__events, (time.monotonic() + delay, next(self.__sequence), function, args))
+            self.__condition.notify()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while self.__running:
+                    now = time.monotonic()
+                    if self.__events and self.__events[0][0] <= now:
+                        break
+                    timeout = self.__events[0][0] - now if self.__events else None
+                    self.__condition.wait(timeout)
+                if not self.__running:
+                    return
+                due, sequence, function, args = heapq.heappop(self.__events)
+            function(*args)
+            self.cpu = time.thread_time()
+
+    def addDriver(self, driver):
+        driver.server = self
+        self.drivers[driver.name] = driver
+        for client in list(self.clients):
+            self.schedule(self.latency, self.__defineAll, client, [driver])
+        return driver
+
+    def attach(self, client):
+        self.clients.append(client)
+        self.schedule(0, client.serverConnected)
+        self.schedule(self.latency, self.__defineAll, client, list(self.drivers.values()))
+
+    def __defineAll(self, client, drivers):
+        for driver in drivers:
+            for prop in driver.properties.values():
+                client._define(driver.name, driver.interface, prop)
+
+    def detach(self, client, code=0):
+        if client in self.clients:
+            self.clients.remove(client)
+        client._forget()
+        client.serverDisconnected(code)
+
+    def submit(self, device, name, prop):
+        """ A client request, handed to the driver after latency """
+        driver = self.drivers.get(device)
+        if driver is not None:
+            self.schedule(self.latency, driver.handle, name, prop)
+
+    def publish(self, prop):
+        """ Send the current value of a driver property to every client """
+        prop = prop.copy()
+        for client in list(self.clients):
+            self.schedule(self.latency, self.__deliver, client, prop)
+
+    def __deliver(self, client, prop):
+        self.delivered += 1
+        client._update(prop)
+
+
+class Driver:
+    """ A device with a CONNECTION switch, accepting any new value """
+
+    interface = BaseDevice.GENERAL_INTERFACE
+
+    def __init__(self, name):
+        self.name = name
+        self.server = None
+        self.properties = {}
+        self.define(switch(name, 'CONNECTION', [('CONNECT', False), ('DISCONNECT', True)]))
+        self.define(text(name, 'DRIVER_INFO', [
+            ('DRIVER_NAME', type(self).__name__), ('DRIVER_INTERFACE', str(self.interface))
+        ], perm=IP_RO, group='General Info'))
+
+    def define(self, prop):
+        self.properties[prop.name] = prop
+        return prop
+
+    def handle(self, name, request):
+        """ A client sent new values for property name """
+        prop = self.properties.get(name)
+        if prop is None:
+            return
+        prop.assign(request)
+        prop.s = IPS_OK
+        self.server.publish(prop)
+
+
+class Telescope(Driver):
+    """
+    A mount slewing each axis at slewRate degrees per second, reporting its
+    position updateRate times per second while slewing and trackingRate
+    times per second otherwise (0 for never).
+    """
+
+    interface = BaseDevice.TELESCOPE_INTERFACE
+
+    def __init__(self, name='Telescope Simulator', slewRate=3.0, updateRate=10.0,
+                 trackingRate=0.0, ra=0.0, dec=90.0):
+        super().__init__(name)
+        self.slewRate = slewRate
+        self.updateRate = updateRate
+        self.trackingRate = trackingRate
+        self.target = None
+        self.define(switch(name, 'ON_COORD_SET', [('TRACK', True), ('SLEW', False), ('SYNC', False)]))
+        self.coords = self.define(number(name, 'EQUATORIAL_EOD_COORD', [
+            ('RA', ra / 15, 0, 24), ('DEC', dec, -90, 90)
+        ]))
+        self.define(switch(name, 'TELESCOPE_ABORT_MOTION', [('ABORT', False)], rule=ISR_ATMOST1))
+        self.define(number(name, 'GEOGRAPHIC_COORD', [
+            ('LAT', 0.0, -90, 90), ('LONG', 0.0, 0, 360), ('ELEV', 0.0, -200, 10000)
+        ], group='Site Management'))
+        self.__tracking = False
+
+    def handle(self, name, request):
+        if name == 'EQUATORIAL_EOD_COORD':
+            ra, dec = request.find('RA').value * 15, request.find('DEC').value
+            if self.properties['ON_COORD_SET'].find('SYNC').s == ISS_ON:
+                self.__moveTo(ra, dec)
+                self.coords.s = IPS_OK
+                self.server.publish(self.coords)
+                return
+            slewing = self.target is not None
+            self.target = (ra, dec)
+            self.coords.s = IPS_BUSY
+            self.server.publish(self.coords)
+            if not slewing:
+                self.server.schedule(1 / self.updateRate, self.__step, time.monotonic())
+        elif name == 'TELESCOPE_ABORT_MOTION':
+            self.target = None
+            abort = self.properties[name]
+            abort.s = IPS_OK
+            self.server.publish(abort)
+            self.coords.s = IPS_IDLE
+            self.server.publish(self.coords)
+        else:
+            super().handle(name, request)
+            if name == 'CONNECTION':
+                self.track(self.trackingRate)
+
+    def position(self):
+        """ ra, dec of the mount in degrees """
+        return self.coords.find('RA').value * 15, self.coords.find('DEC').value
+
+    def __moveTo(self, ra, dec):
+        self.coords.find('RA').value = (ra % 360) / 15
+        self.coords.find('DEC').value = dec
+
+    def __step(self, last):
+        if self.target is None:
+            return
+        now = time.monotonic()
+        move = self.slewRate * (now - last)
+        ra, dec = self.position()
+        # shortest way round in RA
+        dRa = (self.target[0] - ra + 180) % 360 - 180
+        dDec = self.target[1] - dec
+        ra += max(-move, min(move, dRa))
+        dec += max(-move, min(move, dDec))
+        self.__moveTo(ra, dec)
+        if abs(dRa) <= move and abs(dDec) <= move:
+            self.target = None
+            self.coords.s = IPS_OK
+        self.server.publish(self.coords)
+        if self.target is not None:
+            self.server.schedule(1 / self.updateRate, self.__step, now)
+
+    def track(self, rate):
+        """ Report the position rate times per second when not slewing, 0 to stop """
+        self.trackingRate = rate
+        if rate and not self.__tracking:
+            self.__tracking = True
+            self.server.schedule(1 / rate, self.__track)
+
+    def __track(self):
+        if not self.trackingRate:
+            self.__tracking = False
+            return
+        if self.target is None:
+            self.server.publish(self.coords)
+        self.server.schedule(1 / self.trackingRate, self.__track)
+
+
+def install(host='localhost', port=7624, latency=0.0):
+    """
+    Register this module as PyIndi and start a server at host:port,
+    return the server
+    """
+    sys.modules['PyIndi'] = sys.modules[__name__]
+    return FakeServer(host, port, latency).start()
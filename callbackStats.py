@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+
+
+class CallbackStats:
+    """
+    Per-(device, property) counters of the property updates received by
+    IndiClient, and rate limiting of the matching log lines: a property
+    is logged at most once every interval seconds, together with the
+    number of updates that were not logged in between.
+    Nothing is formatted when the logger doesn't emit INFO records.
+    """
+
+    # counters of a property: total, updates in the current window, window
+    # start, rate of the last complete window, time of the last log line and
+    # updates not logged since
+    TOTAL, COUNT, START, RATE, LOGGED, SKIPPED = range(6)
+
+    def __init__(self, logger, interval=5.0, window=10.0):
+        self.logger = logger
+        self.interval = interval
+        self.window = window
+        self.__lock = threading.Lock()
+        self.__counters = {}
+
+    def record(self, device, name):
+        """
+        Count an update of device/name. Return the number of updates
+        skipped since the last log line if this one should be logged,
+        None otherwise.
+        """
+        now = time.monotonic()
+        key = (device, name)
+        with self.__lock:
+            c = self.__counters.get(key)
+            if c is None:
+                c = self.__counters[key] = [0, 0, now, 0.0, None, 0]
+            c[self.TOTAL] += 1
+            c[self.COUNT] += 1
+            elapsed = now - c[self.START]
+            if elapsed >= self.window:
+                c[self.RATE] = c[self.COUNT] / elapsed
+                c[self.COUNT] = 0
+                c[self.START] = now
+
+            if not self.logger.isEnabledFor(logging.INFO):
+                return None
+            if c[self.LOGGED] is not None and now - c[self.LOGGED] < self.interval:
+                c[self.SKIPPED] += 1
+                return None
+            skipped = c[self.SKIPPED]
+            c[self.LOGGED] = now
+            c[self.SKIPPED] = 0
+            return skipped
+
+    def rates(self):
+        """
+        Return a list of (device, property, total updates, updates per
+        second) sorted by decreasing rate. The rate is the one of the last
+        complete window, or of the current one while the first is running
+        or once it has lasted longer than a window.
+        """
+        now = time.monotonic()
+        with self.__lock:
+            counters = [(key, list(c)) for key, c in self.__counters.items()]
+        result = []
+        for (device, name), c in counters:
+            elapsed = now - c[self.START]
+            rate = c[self.RATE]
+            # first window still running, or no update for a whole window
+            if c[self.TOTAL] == c[self.COUNT] or elapsed >= self.window:
+                rate = c[self.COUNT] / max(elapsed, 1e-3)
+            result.append((device, name, c[self.TOTAL], rate))
+        return sorted(result, key=lambda r: r[3], reverse=True)
+
+    def reset(self):
+        with self.__lock:
+            self.__counters.clear()
@@ -1,81 +1,190 @@
 #!/usr/bin/env python
 
+import time
+started = time.perf_counter()
+
+import argparse
 import cmd
-from coords import Coords as coords
-from resolver import resolv as res
 import configparser
 from termcolor import cprint, colored
-import time
-import PyIndi
-import indiClient
-from astropy.coordinates import SkyCoord, FK5
-import astropy.units as u
+import tracing
+
+# Heavy modules (astropy, Skyfield, PyIndi, NumPy) are imported by the
+# commands that need them, so that the prompt shows up quickly
 
 cfg = configparser.ConfigParser()
 # check if config file exists
 config = 'config.ini'
-client = indiClient.IndiClient()
-
-try:
-    cfg.read(config)
-except FileNotFoundError:
-    print(colored("Error: No config file found"), 'red')
-    exit(1)
-except configparser.MissingSectionHeaderError:
-    print(colored("Error: Invalid config file"), 'red')
-    exit(1)
-except configparser.DuplicateOptionError:
-    print(colored("Error: Duplicate item in config file"), 'red')
-    exit(1)
-
-try:
-    with open(cfg['UI']['banner'], 'r') as f:
-        bannerText = f.read()
-        bannerColor = cfg['UI']['bannerColor']
-except FileNotFoundError:
-    banner = ''
+client = None
+# the INDI servers and mounts of the [INDI.n] sections
+indiPool = None
 
 pos = {}
+productName = ''
+bannerText = ''
+bannerColor = None
+
+# time spent in each startup stage, reported with --timing
+timings = []
+
+# how long to wait for the telescope driver to show up, in seconds
+DEVICE_TIMEOUT = 5
+# longest time between two refreshes of the slew progress, in seconds
+SLEW_REFRESH = 1.0
 
-productName = cfg.get('UI', 'productName')
 
-# OBS.1 is the default observatory position
-try:
-    for key in cfg['OBS.1']:
+def timing(stage, since):
+    """ Record the time elapsed since since for a startup stage """
+    now = time.perf_counter()
+    timings.append((stage, now - since))
+    return now
+
+
+def getPool():
+    """ Return the pool of INDI connections, created on first use """
+    global indiPool
+    if indiPool is None:
+        from indiPool import IndiPool
         try:
-            pos[key] = cfg.getfloat('OBS.1', key)
-        except ValueError:
-            pos[key] = cfg.get('OBS.1', key)
-except KeyError:
-    print(colored("Error: No [OBS] section found in config.ini"), 'red')
-    exit(1)
+            indiPool = IndiPool(cfg)
+        except ValueError as e:
+            print(colored("Error: " + str(e) + " of config.ini", 'red'))
+            exit(1)
+    return indiPool
+
+
+def getClient():
+    """
+    Return the INDI client of the default mount, created on first use.
+    None, with an error, if no mount is configured.
+    """
+    global client
+    if client is None:
+        mount = getPool().default()
+        if mount is None:
+            print("Error: No [INDI] section found in config.ini")
+            return None
+        client = getPool().client(mount)
+    return client
+
+
+def loadConfig():
+    """ Read config.ini and select the default observatory """
+    global productName, bannerText, bannerColor
+    try:
+        cfg.read(config)
+    except FileNotFoundError:
+        print(colored("Error: No config file found"), 'red')
+        exit(1)
+    except configparser.MissingSectionHeaderError:
+        print(colored("Error: Invalid config file"), 'red')
+        exit(1)
+    except configparser.DuplicateOptionError:
+        print(colored("Error: Duplicate item in config file"), 'red')
+        exit(1)
+
+    try:
+        with open(cfg['UI']['banner'], 'r') as f:
+            bannerText = f.read()
+            bannerColor = cfg['UI']['bannerColor']
+    except FileNotFoundError:
+        bannerText = ''
+
+    productName = cfg.get('UI', 'productName')
+
+    # OBS.1 is the default observatory position
+    try:
+        for key in cfg['OBS.1']:
+            try:
+                pos[key] = cfg.getfloat('OBS.1', key)
+            except ValueError:
+                pos[key] = cfg.get('OBS.1', key)
+    except KeyError:
+        print(colored("Error: No [OBS] section found in config.ini"), 'red')
+        exit(1)
 
 
 class MyCLI(cmd.Cmd):
-    prompt = colored('Scope > ', 'green')
-    intro = 'Welcome to ' + productName + '! Type help or ? to list commands.'
+    PROMPT = colored('Scope > ', 'green')
+    prompt = PROMPT
     telescope = None
+    # print the startup timings once the prompt is ready
+    showTimings = False
+    # number of rows listed by the up command
+    UP_ROWS = 40
+    # objects listed next to the mount position, and how far they may be
+    NEAREST = 3
+    NEAREST_RADIUS = 5.0
+    # observing session queue, created by the first queue command
+    session = None
+    # commands listed by profile show
+    PROFILE_COMMANDS = 5
+    # set while preloop runs: the status it prints doesn't build indexes
+    starting = False
 
     # define what happens when the cli interface is started
     def preloop(self):
         """
         Initialize the CLI.
         """
+        t = time.perf_counter()
+        self.starting = True
+        self.intro = 'Welcome to ' + productName + '! Type help or ? to list commands.'
         print(productName,"is starting....")
+        if cfg.getboolean('UI', 'warmup', fallback=True):
+            # catalogues and ephemeris load while INDI connects
+            from warmup import Warmup
+            Warmup.get().start()
         self.do_connect(self)
-        time.sleep(0.5)
+        t = timing('INDI server', t)
         self.do_connectTelescope(self)
-        time.sleep(0.5)
+        t = timing('telescope', t)
         print(productName, "initialized.")
         self.do_clear(self)
         # move cursor to previous line
         print("\033[F\033[F")
         self.do_banner(self)
         self.do_status(self)
+        timing('status', t)
+        if self.showTimings:
+            self.printTimings()
+        self.starting = False
+        self.updatePrompt()
+
+    def printTimings(self):
+        """
+        Print the time spent in each startup stage.
+        """
+        for stage, duration in timings:
+            print("%-12s %8.1f ms" % (stage, duration * 1000))
+        print("%-12s %8.1f ms" % ('total', (time.perf_counter() - started) * 1000))
 
     def emptyline(self):
         pass
 
+    def postcmd(self, stop, line):
+        self.updatePrompt()
+        return stop
+
+    def updatePrompt(self):
+        """
+        Show the warm-up progress in the prompt until it is over.
+        """
+        from warmup import Warmup
+        warmup = Warmup.get()
+        if not warmup.started or warmup.done:
+            self.prompt = self.PROMPT
+        else:
+            loaded, total = warmup.progress()
+            self.prompt = colored('Scope [loading %d/%d] > ' % (loaded, total), 'green')
+
+    def onecmd(self, line):
+        # group the spans of each command for the profile command
+        if not tracing.enabled or line.startswith('profile'):
+            return super().onecmd(line)
+        with tracing.command(line.strip()):
+            return super().onecmd(line)
+
     def do_banner(self, line):
         """
         Display the banner.
@@ -141,7 +250,10 @@ class MyCLI(cmd.Cmd):
         """
         List available devices.
         """
-        devices = client.devices_names()
+        indi = getClient()
+        if indi is None:
+            return False
+        devices = indi.devices_names()
         for device in devices:
             print(device)
 
@@ -149,7 +261,10 @@ class MyCLI(cmd.Cmd):
         """
         List available telescope devices.
         """
-        devices = client.device_by_interface("Telescope")
+        indi = getClient()
+        if indi is None:
+            return False
+        devices = indi.device_by_interface("Telescope")
         for device in devices:
             print(device)
 
@@ -160,7 +275,6 @@ class MyCLI(cmd.Cmd):
         """
         print("Connecting to telescope")
         self.do_connect(self)
-        time.sleep(0.5)
         self.do_connectTelescope(self)
 
     # define a function to connect to the telescope
@@ -170,21 +284,30 @@ class MyCLI(cmd.Cmd):
         Usage: connect
         """
         print("Connecting to server...")
-        client.setServer(cfg.get('INDI', 'server'), cfg.getint('INDI', 'port'))
-        if not client.connectServer():
+        indi = getClient()
+        if indi is None:
+            return False
+        mount = getPool().default()
+        # through the pool: its lock and the mount's health see this connect
+        if not getPool().connectServer(mount):
             print("Error: Could not connect to server")
             return False
         else:
-            print("Connected to INDI server ", cfg.get('INDI', 'server'), ":", cfg.get('INDI', 'port'))
+            print("Connected to INDI server ", mount.server, ":", mount.port)
 
     def do_connectTelescope(self, line):
         """
         Connect to the telescope.
         Usage: connectTelescope
         """
-        scopeDriver = cfg.get('INDI', 'telescope_driver')
-        self.telescope = client.getDevice(scopeDriver)
+        indi = getClient()
+        if indi is None:
+            return False
+        mount = getPool().default()
+        scopeDriver = mount.driver
         print("Connecting to telescope", scopeDriver, "...")
+        # wait for the server to announce the driver instead of sleeping
+        self.telescope = mount.telescope = indi.waitDevice(scopeDriver, DEVICE_TIMEOUT)
         if not self.telescope:
             print("Error:", scopeDriver, "hasn't been found")
             return False
@@ -197,18 +320,53 @@ class MyCLI(cmd.Cmd):
         Disconnect from the telescope.
         Usage: disconnect
         """
+        indi = getClient()
+        if indi is None:
+            return False
         print("Disconnecting from telescope")
-        client.disconnectServer()
+        indi.disconnectServer()
 
     def do_getConnectionStatus(self, line):
         """
         Get the connection status.
         Usage: getConnectionStatus
         """
-        status = colored("online", 'green') if client.isServerConnected() else colored("offline", 'red')
+        indi = getClient()
+        if indi is None:
+            return False
+        status = colored("online", 'green') if indi.isServerConnected() else colored("offline", 'red')
         print("Connection status is", status)
-        if status == "online":
-            print("Connected to INDI server ", cfg.get('INDI', 'server'), ":", cfg.get('INDI', 'port'))
+        if indi.isServerConnected():
+            mount = getPool().default()
+            print("Connected to INDI server ", mount.server, ":", mount.port)
+
+    def do_mounts(self, line):
+        """
+        List the mounts of the [INDI.n] sections and the health of their
+        link. connect connects every mount, discover lists the devices of
+        their servers.
+        Usage: mounts [connect|discover]
+        """
+        pool = getPool()
+        line = line.strip()
+        if line == 'connect':
+            pool.connectAll()
+        elif line == 'discover':
+            for mount in pool.mounts.values():
+                if not mount.connected:
+                    continue
+                print("%s (%s:%d):" % (mount.name, mount.server, mount.port))
+                for device in pool.discover(mount):
+                    print("   ", device)
+            return
+        elif line:
+            self.printError("Error: Invalid input")
+            return False
+        for h in pool.health():
+            status = colored("online", 'green') if h['connected'] else colored("offline", 'red')
+            print("%-12s %-24s %-24s %s" % (h['name'], h['server'], h['driver'], status))
+            if h['failures']:
+                print("%12s %d failure(s), last: %s" % ('', h['failures'], h['lastError']))
 
     # define a function that diplays the current position of the telescope
     def do_showCurrentScopePos(self, line):
@@ -218,22 +376,47 @@ class MyCLI(cmd.Cmd):
         """
         if not self.isTelecopeConnected():
             return False
+        import PyIndi
+        from coords import Coords as coords
         #  print("Getting current scope position")
         telescope_connect = self.telescope.getSwitch("CONNECTION")
         telescope_connect.reset()
         telescope_connect[0].setState(PyIndi.ISS_ON)
-        client.sendNewProperty(telescope_connect)
+        getClient().sendNewProperty(telescope_connect)
 
         telescope_on_coord_set = self.telescope.getSwitch("ON_COORD_SET")
         telescope_on_coord_set.reset()
         telescope_on_coord_set[0].setState(PyIndi.ISS_ON)
-        client.sendNewProperty(telescope_on_coord_set)
+        getClient().sendNewProperty(telescope_on_coord_set)
 
-        radec = self.telescope.getNumber("EQUATORIAL_EOD_COORD")
+        # read from the client's local copy of the properties
+        radec = getClient().mirror.values(self.telescope.getDeviceName(), "EQUATORIAL_EOD_COORD")
+        if radec is None:
+            print("Scope Current Position : unknown")
+            return False
         # right ascension is in hours, we need to convert it to degrees
-        currentCoords = radec[0].value * 360 / 24, radec[1].value
+        currentCoords = radec['RA'] * 360 / 24, radec['DEC']
         fCoords = coords(currentCoords[0], currentCoords[1])
         print("Scope Current Position :", fCoords.ra_hms, fCoords.dec_dms)
+        self.printNearest(*currentCoords)
+
+    def printNearest(self, ra, dec):
+        """
+        Print the catalogue objects closest to a mount position (degrees,
+        equinox of date). Skipped at startup and until warm-up has loaded
+        the spatial index: the status never waits for it.
+        """
+        from warmup import Warmup
+        if self.starting or not Warmup.get().ready('spatial'):
+            return
+        from precession import fromDate
+        from skyIndex import SkyIndex
+        index = SkyIndex.get()
+        ra, dec = fromDate(ra, dec)
+        rows, separations = index.nearest(float(ra), float(dec), self.NEAREST, self.NEAREST_RADIUS)
+        if len(rows):
+            print("Nearest objects        :", ", ".join(
+                "%s %.2f°" % (index.catalog.names[i], s) for i, s in zip(rows, separations)))
 
     def do_go(self, target):
         """
@@ -242,71 +425,348 @@ class MyCLI(cmd.Cmd):
         """
         self.do_goto(target)
 
-    def do_goto(self, target):
+    def do_goto(self, line):
         """
-        Go to specified target.
-        Usage: goto <target>
+        Go to specified target, with the default mount, the named one or
+        all of them at once.
+        Usage: goto <target> [@mount|@all]
         """
-        if not self.isTelecopeConnected():
+        if not self.parameterTest(line):
             return False
+        target, mountName = self.splitMount(line)
+        if mountName is None:
+            if not self.isTelecopeConnected():
+                return False
+            mounts = None
+        else:
+            mounts = self.selectMounts(mountName)
+            if not mounts:
+                return False
         if not self.parameterTest(target):
             return False
         #  print("Goto", target)
         try:
-            ra, dec = self.lookFor(target)
+            with tracing.span('lookFor'):
+                ra, dec = self.lookFor(target)
             #  c = coords(ra, dec)
             #  print(c.getCoordsString())
+        except TypeError:
+            #  print(self.lookFor(target))
+            print("Error: Target not found")
+            self.printSuggestions(target)
+            return False
+        return self.gotoPosition(ra, dec, mounts)
+
+    def gotoPosition(self, ra, dec, mounts=None):
+        """
+        Slew to ICRS ra, dec (degrees) with the default mount, or with the
+        given mounts at once. Return True on success.
+        """
+        with tracing.span('toEOD'):
+            ra, dec = self.toEOD(ra, dec)
+
+        if mounts is None:
+            return self.slew(getClient(), self.telescope, ra, dec)
+        if len(mounts) == 1:
+            return self.slew(mounts[0].client, mounts[0].telescope, ra, dec)
+
+        # broadcast: the target is resolved once, every mount slews at once
+        from indiPool import IndiPool
+        from slewMonitor import abortMotion
+        print("Slewing", ", ".join(m.name for m in mounts))
+        try:
+            results = IndiPool.run(
+                lambda m: self.slew(m.client, m.telescope, ra, dec, name=m.name),
+                mounts)
+        except KeyboardInterrupt:
+            for m in mounts:
+                abortMotion(m.client, m.telescope)
+            print("\033[K")
+            self.printError("Slews aborted")
+            return False
+        failed = [name for name, ok in results.items() if ok is not True]
+        print("\a")
+        if failed:
+            self.printError("Slew failed on " + ", ".join(failed))
+            return False
+        print("Slews completed")
+        return True
+
+    @staticmethod
+    def splitMount(line):
+        """
+        Split 'target @mount' into (target, mount), mount is None when no
+        mount is given.
+        """
+        words = line.split()
+        if words and words[-1].startswith('@'):
+            return ' '.join(words[:-1]), words[-1][1:]
+        return line, None
+
+    def selectMounts(self, name):
+        """
+        Return the connected mounts matching name (all of them for 'all'),
+        connecting them if needed, None on error.
+        """
+        pool = getPool()
+        if name == 'all':
+            mounts = list(pool.mounts.values())
+        elif name in pool.mounts:
+            mounts = [pool.get(name)]
+        else:
+            self.printError("Error: Unknown mount " + name + ", try mounts")
+            return None
+        offline = [m for m in mounts if not m.connected]
+        if offline:
+            pool.run(pool.connect, offline)
+        for m in offline:
+            if not m.connected:
+                self.printError("Error: %s: %s" % (m.name, m.lastError))
+        mounts = [m for m in mounts if m.connected]
+        return mounts or None
 
-            telescope_connect = self.telescope.getSwitch("CONNECTION")
+    def toEOD(self, ra, dec):
+        """
+        Convert ICRS ra, dec in degrees to the equinox of the date, in
+        degrees too.
+        """
+        from precession import toDate
+        # EQUATORIAL_EOD_COORD is not J2000
+        # and EQUATORIAL_COORD (J2000) is not supported according to
+        # the INDI documentation
+        # so we need to convert the coordinates to Equinox of the date
+        ra, dec = toDate(ra, dec)
+        return float(ra), float(dec)
+
+    def slew(self, client, telescope, ra, dec, name=None):
+        """
+        Slew a mount to ra, dec (degrees, equinox of the date) and wait for
+        the end of the slew. The progress is displayed unless name is
+        given, messages are then prefixed with the mount name (broadcast).
+        Return True on success.
+        """
+        import PyIndi
+        from slewMonitor import SlewMonitor, abortMotion
+        prefix = "" if name is None else name + ": "
+
+        with tracing.span('indi.setup'):
+            telescope_connect = telescope.getSwitch("CONNECTION")
             telescope_connect.reset()
             telescope_connect[0].setState(PyIndi.ISS_ON)
             client.sendNewProperty(telescope_connect)
 
-            telescope_on_coord_set = self.telescope.getSwitch("ON_COORD_SET")
+            telescope_on_coord_set = telescope.getSwitch("ON_COORD_SET")
             telescope_on_coord_set.reset()
             telescope_on_coord_set[0].setState(PyIndi.ISS_ON)
             client.sendNewProperty(telescope_on_coord_set)
 
-            radec = self.telescope.getNumber("EQUATORIAL_EOD_COORD")
+            radec = telescope.getNumber("EQUATORIAL_EOD_COORD")
             while not radec:
                 time.sleep(0.5)
-                radec = self.telescope.getNumber("EQUATORIAL_EOD_COORD")
+                radec = telescope.getNumber("EQUATORIAL_EOD_COORD")
 
-            # EQUATORIAL_EOD_COORD is not J2000
-            # and EQUATORIAL_COORD (J2000) is not supported according to
-            # the INDI documentation
-            # so we need to convert the coordinates to Equinox of the date
-            eod = SkyCoord(ra, dec, unit=(u.deg), frame='icrs')
-            j2k = eod.transform_to(FK5(equinox='J2024'))
-
-            radec[0].setValue(j2k.ra.deg * 24 / 360)
-            radec[1].setValue(j2k.dec.deg)
+        radec[0].setValue(ra * 24 / 360)
+        radec[1].setValue(dec)
 
+        monitor = SlewMonitor(client, telescope.getDeviceName(), ra, dec)
+        try:
+            with monitor, tracing.span('indi.slew'):
+                client.sendNewProperty(radec)
+                progress = self.followSlew(monitor, display=name is None)
         except TypeError:
-            #  print(self.lookFor(target))
-            print("Error: Target not found")
+            self.printError(prefix + "Error: Could not send new property")
+            return False
+        except KeyboardInterrupt:
+            abortMotion(client, telescope)
+            print("\033[K")
+            self.printError("Slew aborted")
             return False
 
-        try:
-            client.sendNewProperty(radec)
-            while radec.getState() == PyIndi.IPS_BUSY:
-                currentCoords = radec[0].value * 360 / 24, radec[1].value
-                fCoords = coords(currentCoords[0], currentCoords[1])
-                cprint("  Scope slewing..." + fCoords.ra_hms + fCoords.dec_dms, 'blue')
+        if name is None:
+            # clear the progress line
+            print("\033[K\033[F")
+        if progress is None:
+            self.printError(prefix + "Error: No answer from the mount")
+            return False
+        if progress.stalled:
+            abortMotion(client, telescope)
+            self.printError(prefix + "Slew stalled %.2f° from target, aborted" % progress.distance)
+            return False
+        if not progress.ok:
+            self.printError(prefix + "Error: Slew failed")
+            return False
+        if name is not None:
+            print(prefix + "Slew completed")
+            return True
+        # Beep so the user knows that the slew is complete
+        print("\a")
+        print("\033[F\033[F")
+        print("Slew completed")
+        return True
+
+    def followSlew(self, monitor, display=True):
+        """
+        Display the progress of a slew from the mount position updates until
+        it is over or stalled, return the last progress.
+        """
+        from coords import Coords as coords
+        from slewMonitor import SlewMonitor
+        progress = monitor.wait(SLEW_REFRESH)
+        waited = 0
+        while progress is None or not progress.done:
+            if progress is None:
+                # the server hasn't acknowledged the new position yet
+                waited += SLEW_REFRESH
+                if waited > SlewMonitor.STALL_TIME:
+                    return None
+            elif progress.stalled:
+                return progress
+            elif display:
+                fCoords = coords(progress.ra, progress.dec)
+                eta = "--" if progress.eta is None else "%.0fs" % progress.eta
+                cprint("  Scope slewing... %s %s  %.2f° to go, ETA %s\033[K" % (
+                    fCoords.ra_hms, fCoords.dec_dms, progress.distance, eta), 'blue')
                 # set the cursor position at the end of the previous line
                 print("\033[F\033[F")
-                time.sleep(0.5)
-            # Beep so the user knows that the slew is complete
-            print("\a")
-            print("\033[F\033[F")
-            # clear the current line
-            print("\033[K\033[F")
-            print("Slew completed")
+            progress = monitor.wait(SLEW_REFRESH)
+        return progress
 
-        except TypeError:
-            print("Error: Could not send new property")
+    def do_abort(self, line):
+        """
+        Stop any motion of the telescope. During a goto, Ctrl-C does the same.
+        Usage: abort
+        """
+        if not self.isTelecopeConnected():
+            return False
+        from slewMonitor import abortMotion
+        if not abortMotion(getClient(), self.telescope):
+            self.printError("Error: The mount can't abort its motion")
+            return False
+        print("Abort requested")
+
+    def do_queue(self, line):
+        """
+        Observing session queue. Targets are resolved in one pass and ordered
+        to keep the slews short, above the horizon and without meridian
+        flips during a dwell (seconds, default 60).
+        Usage: queue [list]
+               queue add <target> [dwell]
+               queue load <file>
+               queue remove <target>
+               queue clear
+               queue plan [minAlt]
+               queue run [minAlt] [@mount|@all]
+        """
+        from sessionQueue import SessionQueue, parseEntry, readTargets
+        if self.session is None:
+            self.session = SessionQueue()
+        args = line.split(None, 1)
+        command = args[0] if args else 'list'
+        rest = args[1] if len(args) > 1 else ''
+
+        if command == 'add':
+            entry = parseEntry(rest)
+            if entry is None:
+                self.printError("Error: Missing parameter")
+                return False
+            self.session.extend([entry])
+        elif command == 'load':
+            if not self.parameterTest(rest):
+                return False
+            try:
+                entries = readTargets(rest.strip())
+            except OSError as e:
+                self.printError("Error: " + str(e))
+                return False
+            self.session.extend(entries)
+            print(len(entries), "targets added")
+        elif command == 'remove':
+            if not self.session.remove(rest.strip()):
+                self.printError("Error: " + rest.strip() + " is not queued")
+                return False
+        elif command == 'clear':
+            self.session.clear()
+        elif command == 'list':
+            for entry in self.session.entries:
+                print("%-20s %6.0fs" % (entry.name, entry.dwell))
+            print(len(self.session), "targets queued")
+        elif command in ('plan', 'run'):
+            target, mountName = self.splitMount(rest)
+            try:
+                minAlt = float(target) if target else cfg.getfloat('QUEUE', 'min_alt', fallback=0.0)
+            except ValueError:
+                self.printError("Error: Invalid input")
+                return False
+            steps = self.planQueue(minAlt)
+            if command == 'run' and steps:
+                return self.runQueue(steps, mountName)
+        else:
+            self.printError("Error: Unknown queue command " + command)
             return False
 
+    def planQueue(self, minAlt):
+        """
+        Order the queued targets from the current position of the mount and
+        print the plan, return its steps.
+        """
+        from coords import Coords as coords
+        from warmup import Warmup
+        if not len(self.session):
+            print("The queue is empty")
+            return []
+        Warmup.get().require('ephemeris', 'bsc5p', 'ngc', 'hipparcos', 'names')
+        start = None
+        if self.telescope:
+            radec = getClient().mirror.values(self.telescope.getDeviceName(), "EQUATORIAL_EOD_COORD")
+            if radec is not None:
+                start = (radec['RA'] * 15, radec['DEC'])
+        steps, skipped = self.session.plan(
+            pos, start, minAlt, cfg.getboolean('QUEUE', 'meridian', fallback=True))
+        for entry, reason in skipped:
+            self.printError("%s: %s, skipped" % (entry.name, reason))
+        total = 0
+        for i, step in enumerate(steps, 1):
+            c = coords(step.ra, step.dec)
+            print("%2d %-20s %s  alt %5.1f°  slew %6.1f°  %+5.0f min" % (
+                i, step.entry.name, c.getCoordsString(), step.alt, step.slew,
+                (step.arrival - steps[0].start) * 1440))
+            total += step.slew
+        print("Total slew %.1f°" % total)
+        return steps
+
+    def runQueue(self, steps, mountName=None):
+        """
+        Slew to each planned target in turn and stay there for its dwell
+        time. Observed targets leave the queue, Ctrl-C stops it.
+        """
+        mounts = None
+        if mountName is None:
+            if not self.isTelecopeConnected():
+                return False
+        else:
+            mounts = self.selectMounts(mountName)
+            if not mounts:
+                return False
+        for i, step in enumerate(steps, 1):
+            print("[%d/%d] %s" % (i, len(steps), step.entry.name))
+            if not self.gotoPosition(step.ra, step.dec, mounts):
+                self.printError("Queue stopped at " + step.entry.name)
+                return False
+            try:
+                remaining = step.entry.dwell
+                while remaining > 0:
+                    print("  Dwelling on %s, %.0fs left\033[K" % (step.entry.name, remaining))
+                    print("\033[F\033[F")
+                    time.sleep(min(1.0, remaining))
+                    remaining -= 1.0
+            except KeyboardInterrupt:
+                print("\033[K")
+                self.printError("Queue stopped at " + step.entry.name)
+                return False
+            print("\033[K", end='')
+            self.session.remove(step.entry.name)
+        print("Queue completed")
+
     # define a function that diplays current status using some of the methods defined in this class, such as connection status, observatory, and current position
     def do_status(self, line):
         """
@@ -343,6 +803,7 @@ class MyCLI(cmd.Cmd):
         """
         if not self.parameterTest(target):
             return False
+        from coords import Coords as coords
         #  print("Goto", target)
         try:
             ra, dec = self.lookFor(target)
@@ -352,8 +813,98 @@ class MyCLI(cmd.Cmd):
 
         except TypeError:
             print("Error: Target not found")
+            self.printSuggestions(target)
             return False
 
+    def do_near(self, line):
+        """
+        List the stars and deep-sky objects within radius degrees (default 1)
+        of a target, closest first.
+        Usage: near <target> [radius]
+        """
+        if not self.parameterTest(line):
+            return False
+        import numpy as np
+        from coords import CoordArray
+        from skyCatalog import STAR
+        from skyIndex import SkyIndex
+        from warmup import Warmup
+        words = line.split()
+        radius = 1.0
+        if len(words) > 1:
+            try:
+                radius = float(words[-1])
+                words = words[:-1]
+            except ValueError:
+                pass
+        target = ' '.join(words)
+        try:
+            ra, dec = self.lookFor(target)
+        except TypeError:
+            print("Error: Target not found")
+            self.printSuggestions(target)
+            return False
+
+        Warmup.get().require('spatial')
+        index = SkyIndex.get()
+        sky = index.catalog
+        rows, separations = index.cone(ra, dec, radius)
+        print("%d objects within %g° of %s" % (len(rows), radius, target))
+        positions = CoordArray(sky.ra[rows[:self.UP_ROWS]], sky.dec[rows[:self.UP_ROWS]]).getCoordsStrings()
+        for i, separation, position in zip(rows, separations, positions):
+            kind = 'star' if sky.kinds[i] == STAR else 'dso'
+            mag = '' if np.isnan(sky.mag[i]) else '%5.2f' % sky.mag[i]
+            print("%-16s %-4s %6.3f° %5s  %s" % (sky.names[i], kind, separation, mag, position))
+        if len(rows) > self.UP_ROWS:
+            print("...", len(rows) - self.UP_ROWS, "more")
+
+    def do_up(self, line):
+        """
+        List the stars and deep-sky objects currently above the horizon.
+        Sorted by altitude (default) or by magnitude, brightest first.
+        Usage: up [minAlt] [maxMag] [alt|mag]
+        """
+        import numpy as np
+        from altaz import radec2altaz
+        from coords import CoordArray
+        from skyCatalog import SkyCatalog, STAR
+        from warmup import Warmup
+        args = line.split()
+        try:
+            minAlt = float(args[0]) if len(args) > 0 else 0.0
+            maxMag = float(args[1]) if len(args) > 1 else None
+        except ValueError:
+            self.printError("Error: Invalid input")
+            return False
+        sortKey = args[2] if len(args) > 2 else 'alt'
+        if sortKey not in ('alt', 'mag'):
+            self.printError("Error: sort by alt or mag")
+            return False
+
+        Warmup.get().require('spatial')
+        sky = SkyCatalog.get()
+        alt, az = radec2altaz(sky.ra, sky.dec, pos['lat'], pos['lon'], j2000=True)
+        visible = alt >= minAlt
+        if maxMag is not None:
+            visible &= sky.mag <= maxMag
+        idx = np.flatnonzero(visible)
+        if sortKey == 'alt':
+            idx = idx[np.argsort(-alt[idx])]
+        else:
+            # objects without magnitude last
+            idx = idx[np.argsort(np.nan_to_num(sky.mag[idx], nan=99.0))]
+
+        print("%d objects above %g° from %s" % (len(idx), minAlt, pos['name']))
+        rows = idx[:self.UP_ROWS]
+        positions = CoordArray(sky.ra[rows], sky.dec[rows]).getCoordsStrings()
+        for i, position in zip(rows, positions):
+            kind = 'star' if sky.kinds[i] == STAR else 'dso'
+            mag = '' if np.isnan(sky.mag[i]) else '%5.2f' % sky.mag[i]
+            print("%-16s %-4s alt %5.1f° az %5.1f° %5s  %s" % (
+                sky.names[i], kind, alt[i], az[i], mag, position))
+        if len(idx) > self.UP_ROWS:
+            print("...", len(idx) - self.UP_ROWS, "more")
+
     # define a function that lists Observatories
     def do_listObs(self, line):
         """
@@ -390,6 +941,7 @@ class MyCLI(cmd.Cmd):
             # print the name of the observatory
             print("Observatory is now : <", pos['name'], ">")
             print("Obs position is ", pos['lat'], pos['lon'], pos['elev'])
+            self.invalidatePositions()
 
         except KeyError:
             print("Error: No [OBS] section found in config.ini")
@@ -411,6 +963,7 @@ class MyCLI(cmd.Cmd):
             pos['elev'] = float(elev)
             pos['name'] = name
             print("Obs position set to", pos['lat'], pos['lon'], pos['elev'])
+            self.invalidatePositions()
 
         except ValueError:
             print("Error: Invalid input")
@@ -424,6 +977,175 @@ class MyCLI(cmd.Cmd):
         print("Observatory : ", pos['name'])
         print("Lat, Lon, Elev : ", pos['lat'], pos['lon'], pos['elev'])
 
+    def do_precompute(self, line):
+        """
+        Precompute an interpolated ephemeris of the Moon, the Sun and the
+        planets for the active observatory, valid for the given number of
+        hours (default 12). Planet lookups inside that window are then
+        answered without running Skyfield.
+        Usage: precompute [hours]
+        """
+        from ephemCache import EphemerisCache
+        from resolver import planets
+        try:
+            hours = float(line) if line else 12
+        except ValueError:
+            self.printError("Error: Invalid input")
+            return False
+        bodies = [p for p in planets if p != 'EARTH']
+        cache = EphemerisCache.build(pos, bodies, hours)
+        print("Ephemeris precomputed for", pos['name'], "for", hours, "hours")
+        worst = max(cache.errors, key=cache.errors.get)
+        print("Max interpolation error %.4f″ (%s)" % (cache.errors[worst], worst))
+
+    def do_stats(self, line):
+        """
+        Show how often each INDI property is updated by the server.
+        Usage: stats [reset]
+        """
+        if client is None:
+            print("Not connected to an INDI server")
+            return False
+        if line.strip() == 'reset':
+            client.stats.reset()
+            return
+        rates = client.stats.rates()
+        if not rates:
+            print("No property update received")
+        for device, name, total, rate in rates:
+            print("%-24s %-32s %8d updates %8.2f /s" % (device, name, total, rate))
+
+    def do_rebuildIndex(self, line):
+        """
+        Rebuild the catalogue indexes after their source files changed.
+        Usage: rebuildIndex
+        """
+        from getPosFromBSC5P import BSC5P
+        from getPosFromMessier import Messier
+        from nameIndex import NameIndex
+        from warmup import Warmup, LOADERS
+        # not while the warm-up is reading them
+        Warmup.get().require(*LOADERS)
+        print("Rebuilding BSC5P name index...")
+        BSC5P._indexes.clear()
+        BSC5P().buildIndex()
+        print("Rebuilding NGC/IC/Messier index...")
+        Messier.close()
+        Messier().buildIndex()
+        NameIndex.reset()
+        self.invalidatePositions()
+        print("Indexes rebuilt")
+
+    def do_cache(self, line):
+        """
+        Show the counters of the cache of resolved positions, or empty it.
+        Usage: cache [clear]
+        """
+        from resolveCache import ResolveCache
+        cache = ResolveCache.get()
+        if line.strip() == 'clear':
+            cache.invalidate()
+            return
+        elif line.strip():
+            self.printError("Error: Invalid input")
+            return False
+        stats = cache.stats()
+        lookups = stats['hits'] + stats['misses']
+        print("Positions cached : %d/%d" % (stats['entries'], stats['size']))
+        print("Hits, misses     : %d, %d (%.0f%% hits)" % (
+            stats['hits'], stats['misses'], 100 * stats['hits'] / lookups if lookups else 0))
+        print("Evictions        :", stats['evictions'])
+
+    def do_warmup(self, line):
+        """
+        Show which catalogues and ephemeris are loaded by the background
+        warm-up started with the CLI, and how long they took.
+        Usage: warmup
+        """
+        from warmup import Warmup
+        warmup = Warmup.get()
+        if not warmup.started:
+            print("Warm-up disabled, data sets are loaded on first use")
+            return
+        for name in warmup.loaders:
+            if name in warmup.errors:
+                status = colored("failed: " + str(warmup.errors[name]), 'red')
+            elif warmup.events[name].is_set():
+                status = colored("ready", 'green') + " in %.2f s" % warmup.durations[name]
+            elif name == warmup.current:
+                status = colored("loading", 'yellow')
+            else:
+                status = "waiting"
+            print("%-12s %s" % (name, status))
+
+    def invalidatePositions(self):
+        """
+        Forget the cached positions, after the site or the catalogues changed.
+        """
+        from resolveCache import ResolveCache
+        ResolveCache.get().invalidate()
+
+    def do_profile(self, line):
+        """
+        Time the stages of the following commands (catalogues, ephemeris,
+        alt/az, INDI...) and show the breakdown of the last N ones, or save
+        them as a Chrome trace (chrome://tracing, Perfetto).
+        Usage: profile on|off|clear
+               profile show [N]
+               profile export <file> [N]
+        """
+        args = line.split()
+        command = args[0] if args else 'show'
+        try:
+            if command == 'export':
+                count = int(args[2]) if len(args) > 2 else None
+            else:
+                count = int(args[1]) if len(args) > 1 else self.PROFILE_COMMANDS
+        except ValueError:
+            self.printError("Error: Invalid input")
+            return False
+
+        if command == 'on':
+            tracing.enable()
+            print("Profiling on")
+        elif command == 'off':
+            tracing.enable(False)
+            print("Profiling off")
+        elif command == 'clear':
+            tracing.clear()
+        elif command == 'show':
+            commands = tracing.commands(count)
+            if not commands:
+                print("No command profiled" + ("" if tracing.enabled else ", try profile on"))
+            for c in commands:
+                self.printProfile(c)
+        elif command == 'export':
+            if len(args) < 2:
+                self.printError("Error: Missing parameter")
+                return False
+            try:
+                events = tracing.export(args[1], count)
+            except OSError as e:
+                self.printError("Error: " + str(e))
+                return False
+            print(events, "events written to", args[1])
+        else:
+            self.printError("Error: Unknown profile command " + command)
+            return False
+
+    def printProfile(self, command):
+        """
+        Print the time spent in each stage of a profiled command.
+        """
+        cprint("%-40s %10.1f ms" % (command.line, command.duration * 1000), 'blue')
+        stages = tracing.breakdown(command)
+        # time spent outside of the outermost spans
+        other = tracing.other(command)
+        for name, depth, duration, calls in stages + [('other', 0, other, 1)]:
+            label = "  " * (depth + 1) + name + ("" if calls == 1 else " (x%d)" % calls)
+            print("%-40s %10.1f ms %5.1f%%" % (
+                label, duration * 1000, 100 * duration / command.duration))
+
     # define a function that clears the screen
     def do_clear(self, line):
         """Clear the screen."""
@@ -440,11 +1162,72 @@ class MyCLI(cmd.Cmd):
         """
         if not self.parameterTest(target):
             return False
+        from warmup import Warmup, NEEDS
+        warmup = Warmup.get()
+        # every resolve uses the ephemeris, loaded with the resolver modules
+        warmup.require('ephemeris')
+        from resolver import resolv as res
+        res.altazEngine = cfg.get('RESOLVER', 'altaz_engine', fallback='native')
         r = res(target)
+        if r.classify(target)[0] == 'unknown':
+            # proper and common names, e.g. Polaris or Andromeda Galaxy
+            from nameIndex import NameIndex
+            warmup.require('names')
+            with tracing.span('nameIndex'):
+                name = NameIndex.get().target(target)
+            if name is not None:
+                r = res(name)
         r.setPosFromDict(pos)
-        ra, dec = r.resolve()
+        # show M42 then goto M42 resolves it once, see resolveCache.py
+        from resolveCache import ResolveCache
+        cache = ResolveCache.get()
+        objectType = r.classify(r.obj)[0]
+        cached = cache.lookup(r.obj, objectType, pos)
+        if cached is not None:
+            ra, dec = cached
+            # resolve() positions are on the ICRS axes, whatever the type
+            r.summary(ra, dec)
+            return ra, dec
+        warmup.require(*NEEDS[objectType])
+        with tracing.span('resolve'):
+            ra, dec = r.resolve()
+        if ra is not None:
+            cache.store(r.obj, objectType, pos, (ra, dec))
         return ra, dec
 
+    def completeTarget(self, text, line, begidx, endidx):
+        """
+        Complete a target name, or a mount name after @. Names may hold
+        spaces, only the part after the word being completed is returned.
+        """
+        if begidx > 0 and line[begidx - 1] == '@':
+            return [name for name in getPool().names() + ['all'] if name.startswith(text)]
+        args = line[:endidx].split(None, 1)
+        prefix = args[1] if len(args) > 1 else ''
+        if not prefix.strip():
+            return []
+        from nameIndex import NameIndex
+        from warmup import Warmup
+        # don't block the prompt, there is nothing to complete until then
+        if not Warmup.get().ready('names'):
+            return []
+        offset = len(prefix) - len(text)
+        return [name[offset:] for name in NameIndex.get().complete(prefix)]
+
+    complete_goto = complete_g = complete_go = completeTarget
+    complete_show = complete_s = complete_near = completeTarget
+
+    def printSuggestions(self, target):
+        """
+        Print the known names closest to a target that wasn't found.
+        """
+        from nameIndex import NameIndex
+        from warmup import Warmup
+        Warmup.get().require('names')
+        suggestions = NameIndex.get().suggest(target)
+        if suggestions:
+            print("Did you mean:", ", ".join(suggestions), "?")
+
     # Define a function that test if required parameter is given
     def parameterTest(self, line):
         """
@@ -463,5 +1246,21 @@ class MyCLI(cmd.Cmd):
         """
         print(colored(line, 'red'))
 
+def main():
+    parser = argparse.ArgumentParser(description='Telescope control CLI')
+    parser.add_argument(
+        '--timing',
+        action='store_true',
+        help='report the time spent in each startup stage'
+    )
+    args = parser.parse_args()
+    t = timing('imports', started)
+    loadConfig()
+    timing('config', t)
+    cli = MyCLI()
+    cli.showTimings = args.timing
+    cli.cmdloop()
+
+
 if __name__ == '__main__':
-    MyCLI().cmdloop()
+    main()
@@ -1,40 +1,72 @@
+import numpy as np
 
 
 class Coords:
     """ Class to store coordinates of a point in the sky - ra and dec are
-    expected to be in decimal degrees """
+    expected to be in decimal degrees. The sexagesimal strings are only
+    computed when first asked for, then cached until the position changes """
+
+    __slots__ = ('_ra', '_dec', '_ra_hms', '_dec_dms')
+
+    cfg = {
+        'HMSFormat': "%02dh%02d′%04.1f″",
+        'DMSFormat': "%s%02d°%02d′%04.1f″"
+    }
 
     def __init__(self, ra: float, dec: float) -> None:
-        self.ra  = float(ra)
-        self.dec = float(dec)
-        self.cfg = dict({
-            'HMSFormat': "%02dh%02d′%04.1f″",
-            'DMSFormat': "%s%02d°%02d′%04.1f″"
-        })
-        self.ra_hms = self.ra2hms()
-        self.dec_dms = self.dec2dms()
+        self.set(ra, dec)
+
+    @property
+    def ra(self):
+        return self._ra
+
+    @ra.setter
+    def ra(self, value):
+        self._ra = float(value)
+        self._ra_hms = None
+
+    @property
+    def dec(self):
+        return self._dec
+
+    @dec.setter
+    def dec(self, value):
+        self._dec = float(value)
+        self._dec_dms = None
+
+    @property
+    def ra_hms(self):
+        if self._ra_hms is None:
+            self._ra_hms = self.ra2hms()
+        return self._ra_hms
+
+    @property
+    def dec_dms(self):
+        if self._dec_dms is None:
+            self._dec_dms = self.dec2dms()
+        return self._dec_dms
 
     def set(self, ra: float, dec: float) -> None:
         """ Set the coordinates from ra and dec in decimal degrees"""
-        self.ra  = float(ra)
-        self.dec = float(dec)
+        self.ra = ra
+        self.dec = dec
 
     def setFromDict(self, coordinates: dict):
         """ Set the right ascension and declination from a dictionary """
-        self.ra  = coordinates['ra']
+        self.ra = coordinates['ra']
         self.dec = coordinates['dec']
 
     def getRA(self):
         """ Return the right ascension """
-        return float(self.ra)
+        return self.ra
 
     def getDec(self):
         """ Return the declination """
-        return float(self.dec)
+        return self.dec
 
     def getCoords(self):
         """ Return a dictionary with ra and dec """
-        return {'ra': float(self.ra), 'dec': float(self.dec)}
+        return {'ra': self.ra, 'dec': self.dec}
 
     def getCoordsTuple(self):
         """ Return a tuple with ra and dec """
@@ -45,29 +77,71 @@ class Coords:
         Convert and return a formatted
         string with ra and dec in HMS and DMS
         """
-        return self.ra2hms() + ' ' + self.dec2dms()
+        return self.ra_hms + ' ' + self.dec_dms
 
     def ra2hms(self):
         """ Convert ra in decimal degrees to HMS """
-        ra = float(self.ra)
-        ra = ra / 15.0
-        h = int(ra)
-        m = int((ra - h) * 60)
-        s = (ra - h - m / 60.0) * 3600
-        return self.cfg['HMSFormat'] % (h, m, s)
+        # work in tenths of seconds so that rounding carries into minutes
+        tenths = round(self.ra % 360.0 / 15.0 * 36000) % 864000
+        h, tenths = divmod(tenths, 36000)
+        m, tenths = divmod(tenths, 600)
+        return self.cfg['HMSFormat'] % (h, m, tenths / 10)
 
     def dec2dms(self):
         """ Convert dec in decimal degrees to DMS """
-        dec = float(self.dec)
-        d = int(dec)
-        m = abs(int((dec - d) * 60))
-        r = divmod((dec - d) * 60, 1)
-        s = abs(r[1] * 60)
-        s = (60 - s) * (d < 0) + s * (d > 0)  # store sign in sign variable
-        if dec < 0:
-            d = abs(d)
-            sign = '-'
-        else:
-            sign = '+'
-
-        return self.cfg['DMSFormat'] % (sign, d, m, s)
+        sign = '-' if self.dec < 0 else '+'
+        tenths = round(abs(self.dec) * 36000)
+        d, tenths = divmod(tenths, 36000)
+        m, tenths = divmod(tenths, 600)
+        return self.cfg['DMSFormat'] % (sign, d, m, tenths / 10)
+
+
+class CoordArray:
+    """ Class to store many points of the sky as NumPy arrays of ra and dec
+    in decimal degrees, with vectorised sexagesimal conversion """
+
+    __slots__ = ('ra', 'dec')
+
+    cfg = Coords.cfg
+
+    def __init__(self, ra, dec) -> None:
+        self.ra = np.atleast_1d(np.asarray(ra, dtype=np.float64))
+        self.dec = np.atleast_1d(np.asarray(dec, dtype=np.float64))
+
+    def __len__(self):
+        return len(self.ra)
+
+    def __getitem__(self, index):
+        """ A Coords for an integer index, a CoordArray for anything else """
+        if isinstance(index, (int, np.integer)):
+            return Coords(self.ra[index], self.dec[index])
+        return CoordArray(self.ra[index], self.dec[index])
+
+    def ra2hmsFields(self):
+        """ Return the hours, minutes and seconds arrays of ra """
+        tenths = np.round(np.mod(self.ra, 360.0) / 15.0 * 36000).astype(np.int64) % 864000
+        h, tenths = np.divmod(tenths, 36000)
+        m, tenths = np.divmod(tenths, 600)
+        return h, m, tenths / 10
+
+    def dec2dmsFields(self):
+        """ Return the sign, degrees, minutes and seconds arrays of dec """
+        tenths = np.round(np.abs(self.dec) * 36000).astype(np.int64)
+        d, tenths = np.divmod(tenths, 36000)
+        m, tenths = np.divmod(tenths, 600)
+        sign = np.where(self.dec < 0, '-', '+')
+        return sign, d, m, tenths / 10
+
+    def ra2hms(self):
+        """ Convert every ra to HMS, return a list of strings """
+        fmt = self.cfg['HMSFormat']
+        return [fmt % f for f in zip(*(x.tolist() for x in self.ra2hmsFields()))]
+
+    def dec2dms(self):
+        """ Convert every dec to DMS, return a list of strings """
+        fmt = self.cfg['DMSFormat']
+        return [fmt % f for f in zip(*(x.tolist() for x in self.dec2dmsFields()))]
+
+    def getCoordsStrings(self):
+        """ Return a list of formatted strings with ra and dec in HMS and DMS """
+        return [ra + ' ' + dec for ra, dec in zip(self.ra2hms(), self.dec2dms())]
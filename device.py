@@ -18,9 +18,9 @@ class Device:
         self.interfaces = Device.find_interfaces(self.device)
 
     def __find_device(self):
-        self.device = None
-        while not self.device:
-            self.device = self.indi_client.getDevice(self.name)
+        self.device = self.indi_client.waitDevice(self.name, Device.DEFAULT_TIMEOUT)
+        if not self.device:
+            raise RuntimeError('Timeout finding device {}'.format(self.name))
 
     @property
     def connected(self):
@@ -133,14 +133,19 @@ class Device:
         started = time.time()
         if timeout is None:
             timeout = self.timeout
-        while ctl.s not in statuses:
+
+        def reached():
             # print('{}/{}/{}: {}'.format(ctl.device, ctl.group, ctl.name, self.__state_to_str[ctl.s]))
+            if ctl.s in statuses:
+                return True
             if ctl.s == PyIndi.IPS_ALERT and 0.5 > time.time() - started:
                 raise RuntimeError('Error while changing property {}'.format(ctl.name))
+            return False
+
+        # woken up by the client each time the server updates the property
+        if not self.indi_client.waitFor(reached, self.name, ctl.name, timeout if timeout > 0 else None):
             elapsed = time.time() - started
-            if 0 < timeout < elapsed:
-                raise RuntimeError('Timeout error while changing property {}: elapsed={}, timeout={}, status={}'.format(ctl.name, elapsed, timeout, self.__state_to_str[ctl.s] ))
-            time.sleep(0.01)
+            raise RuntimeError('Timeout error while changing property {}: elapsed={}, timeout={}, status={}'.format(ctl.name, elapsed, timeout, self.__state_to_str[ctl.s] ))
 
     def __map_indexes(self, ctl, values):
         result = {}
@@ -150,13 +155,25 @@ class Device:
         return result
 
     def get_properties(self):
+        mirror = self.__mirror()
+        if mirror is not None:
+            return [ mirror.toDict(r) for r in mirror.snapshot(self.name).values() ]
         properties = self.device.getProperties()
         return [ self.__read_property(p) for p in properties if p]
 
     def get_property(self, name):
+        mirror = self.__mirror()
+        if mirror is not None:
+            record = mirror.get(self.name, name)
+            return mirror.toDict(record) if record else None
         indi_property = self.device.getProperty(name)
         return self.__read_property(indi_property) if indi_property else None
 
+    def __mirror(self):
+        # served from the client's local copy once it knows the device
+        mirror = getattr(self.indi_client, 'mirror', None)
+        return mirror if mirror is not None and mirror.has(self.name) else None
+
     def get_queued_message(self, index):
         return self.device.messageQueue(index)
 
@@ -190,12 +207,15 @@ class Device:
         }[ctl_type]
         if timeout is None:
             timeout = self.timeout
-        started = time.time()
-        while not(ctl):
+
+        def found():
+            nonlocal ctl
             ctl = getattr(self.device, attr)(name)
-            if not ctl and 0 < timeout < time.time() - started:
-                raise RuntimeError('Timeout finding control {}'.format(name))
-            time.sleep(0.01)
+            return bool(ctl)
+
+        # woken up by the client when the server defines the property
+        if not self.indi_client.waitFor(found, self.name, name, timeout if timeout > 0 else None):
+            raise RuntimeError('Timeout finding control {}'.format(name))
         return ctl
 
     def has_control(self, name, ctl_type):
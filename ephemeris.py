@@ -0,0 +1,63 @@
+import threading
+from skyfield.api import Topos, Loader
+
+DATA_DIR = '~/skyfield-data'
+EPHEMERIS = 'de421.bsp'
+
+
+class Ephemeris:
+    """
+    Process-wide Skyfield context: loader, planetary ephemeris and timescale
+    are loaded once, the observer vector is rebuilt only when the site moves.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, datadir=DATA_DIR, ephemeris=EPHEMERIS):
+        self.load = Loader(datadir)
+        self.planets = self.load(ephemeris)
+        self.earth = self.planets['earth']
+        self.ts = self.load.timescale()
+        self._site = None
+        self._observer = None
+
+    @classmethod
+    def get(cls):
+        """ Return the shared context, loading it on first use """
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        """ Drop the shared context so that the next get() reloads it """
+        with cls._lock:
+            cls._instance = None
+
+    def observer(self, pos):
+        """
+        Return the Earth + Topos vector for the given position dictionary
+        (lat, lon, elev), reusing the previous one if the site is unchanged
+        """
+        site = (float(pos['lat']), float(pos['lon']), float(pos['elev']))
+        if site != self._site:
+            self._observer = self.earth + Topos(
+                    site[0],
+                    site[1],
+                    elevation_m=site[2]
+                )
+            self._site = site
+        return self._observer
+
+    def body(self, name):
+        """ Return the ephemeris segment of a planet, the Moon or the Sun """
+        if name.lower() in ('moon', 'sun'):
+            return self.planets[name]
+        return self.planets[name.lower() + ' barycenter']
+
+    def now(self):
+        """ Return the current time on the shared timescale """
+        return self.ts.now()
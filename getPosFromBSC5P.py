@@ -1,40 +1,102 @@
 import json
+import os
+import pickle
 
-#  DATASOURCE = '/home/willy/skyfield-data/bsc5p_extra_min.json'
+# catalogue read when no datasource is given
+DATASOURCE = '/home/willy/skyfield-data/bsc5p_extra_min.json'
+# bumped when the index content changes, older index files are rebuilt
+INDEX_VERSION = 2
+
+
+def normName(name):
+    """ Normalise a star name: case and whitespace insensitive """
+    return ' '.join(name.lower().split())
 
 
 class BSC5P:
 
-    def __init__(self):
-        self.datasource = '/home/willy/skyfield-data/bsc5p_extra_min.json'
-        pass
+    # indexes already loaded in this process, by datasource
+    _indexes = {}
 
-    def getStarFromBayer(self, bayer):
-        """Return the star from the Bayer designation"""
-        data = json.load(open(self.datasource))
-        for star in data:
-            for value in star['namesAlt']:
-                if value == bayer:
-                    # we found the star
-                    break
+    def __init__(self, datasource=None):
+        self.datasource = datasource or DATASOURCE
+        self.indexfile = os.path.splitext(self.datasource)[0] + '.idx.pickle'
 
-        return star
+    def buildIndex(self):
+        """
+        Build the name index from the JSON catalogue and persist it next to it.
+        names maps every normalised alternate name to the position of the star
+        in stars, hips holds the HIP ID of each star (0 if it has none).
+        A name shared by several stars resolves to the last one with a HIP
+        ID, as the linear scan of the catalogue did.
+        """
+        with open(self.datasource) as f:
+            data = json.load(f)
+        names = {}
+        hips = []
+        for i, star in enumerate(data):
+            hipID = 0
+            for name in star['namesAlt']:
+                if name.startswith('HIP'):
+                    hipID = int(name.split(' ')[1])
+            for name in star['namesAlt']:
+                key = normName(name)
+                if hipID or key not in names:
+                    names[key] = i
+            hips.append(hipID)
 
-    def getHipFromBayer(self, bayer):
-        """Return the HIP ID from the Bayer designation"""
-        data = json.load(open(self.datasource))
-        hipID = 0
-        for star in data:
+        index = {'version': INDEX_VERSION, 'stars': data, 'names': names, 'hips': hips}
+        try:
+            tmp = self.indexfile + '.tmp'
+            with open(tmp, 'wb') as f:
+                pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.indexfile)
+        except OSError:
+            # read-only data directory, keep the index in memory only
+            pass
+        return index
 
-            for value in star['namesAlt']:
-                if value.lower() == bayer.lower():
-                    # we found the star but we need to get the
-                    # HIP ID among the other names
-                    for name in star['namesAlt']:
-                        if name.startswith('HIP'):
-                            hipID = name.split(' ')[1]
+    def index(self):
+        """ Return the name index, loading or rebuilding it if needed """
+        index = BSC5P._indexes.get(self.datasource)
+        if index is not None:
+            return index
+        try:
+            stale = os.path.getmtime(self.indexfile) < \
+                os.path.getmtime(self.datasource)
+        except OSError:
+            stale = True
+        if not stale:
+            with open(self.indexfile, 'rb') as f:
+                index = pickle.load(f)
+        if index is None or index.get('version') != INDEX_VERSION:
+            index = self.buildIndex()
+        BSC5P._indexes[self.datasource] = index
+        return index
 
-                    break
+    def getStarFromBayer(self, bayer):
+        """Return the star from the Bayer designation"""
+        index = self.index()
+        i = index['names'].get(normName(bayer))
+        return index['stars'][i] if i is not None else None
 
-        return int(hipID)
+    def getHipFromBayer(self, bayer):
+        """Return the HIP ID from the Bayer designation"""
+        index = self.index()
+        i = index['names'].get(normName(bayer))
+        return index['hips'][i] if i is not None else 0
 
+    def catalog(self):
+        """
+        Return a list of (name, HIP ID) for every star with a HIP ID, the
+        name being the first Bayer/Flamsteed designation (starting with '*')
+        """
+        index = self.index()
+        stars = []
+        for star, hipID in zip(index['stars'], index['hips']):
+            if not hipID:
+                continue
+            names = star['namesAlt']
+            name = next((n for n in names if n.startswith('*')), names[0])
+            stars.append((name, hipID))
+        return stars
@@ -1,29 +1,253 @@
+#!/usr/bin/env python
+"""
+NGC/IC/Messier catalogue lookups.
+
+The JSON export is compiled once into an SQLite index keyed by catalogue
+reference (M31, NGC224, IC1434...) and by object name, with RA/Dec already
+converted to decimal degrees. The index is rebuilt automatically when the
+JSON is newer.
+
+Usage: python getPosFromMessier.py    (rebuild the index)
+"""
+
 import json
+import os
+import re
+import sqlite3
+import threading
+
+CATALOGS = ('m', 'ngc', 'ic')
+
+# catalogue read when no datasource is given
+DATASOURCE = '/home/willy/skyfield-data/ngc-ic-messier-catalog.json'
+# bumped when the schema changes, older index files are rebuilt
+INDEX_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE objects (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    ra REAL,
+    dec REAL,
+    mag REAL,
+    record TEXT
+);
+CREATE TABLE refs (key TEXT PRIMARY KEY, id INTEGER);
+CREATE TABLE names (name TEXT PRIMARY KEY, display TEXT, id INTEGER);
+PRAGMA user_version = %d;
+""" % INDEX_VERSION
+
+REF_RE = re.compile(r'^(\d+)([A-Z]*)$')
+
+
+def normRef(catalog, value):
+    """
+    Normalise a catalogue reference: normRef('ngc', 'NGC0224'),
+    normRef('ngc', 224) and normRef('ngc', 'ngc 224') all give 'NGC224'
+    """
+    if value is None:
+        return None
+    prefix = catalog.upper()
+    ref = str(value).upper().replace(' ', '')
+    if ref.startswith(prefix):
+        ref = ref[len(prefix):]
+    match = REF_RE.match(ref)
+    if not match:
+        return None
+    return prefix + str(int(match.group(1))) + match.group(2)
+
+
+def splitRef(ref):
+    """ Return the normalised reference of a designation such as 'NGC0224' """
+    ref = str(ref).upper().replace(' ', '')
+    # NGC before M, longest prefix first
+    for catalog in ('ngc', 'ic', 'm'):
+        if ref.startswith(catalog.upper()):
+            return normRef(catalog, ref)
+    return None
+
+
+def sexa2deg(value, hours=False):
+    """ Convert a [+-]xx:mm:ss.s string to decimal degrees """
+    value = value.strip()
+    sign = -1 if value.startswith('-') else 1
+    parts = [abs(float(x)) for x in value.lstrip('+-').split(':')]
+    deg = sum(x / 60 ** i for i, x in enumerate(parts))
+    return sign * deg * (15 if hours else 1)
+
+
+def toFloat(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
 
 
 class Messier:
 
-    def __init__(self):
-        self.datasource = \
-            '/home/willy/skyfield-data/ngc-ic-messier-catalog.json'
-        pass
+    # connections already opened in this process, by index file
+    _connections = {}
+    _lock = threading.Lock()
+
+    def __init__(self, datasource=None):
+        self.datasource = datasource or DATASOURCE
+        self.indexfile = os.path.splitext(self.datasource)[0] + '.sqlite'
+
+    def buildIndex(self):
+        """ Compile the JSON catalogue into the SQLite index """
+        with open(self.datasource) as f:
+            data = json.load(f)
+
+        tmp = self.indexfile + '.tmp'
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        db = sqlite3.connect(tmp)
+        db.executescript(SCHEMA)
+        for i, object in enumerate(data):
+            try:
+                ra = sexa2deg(object['ra'], hours=True)
+                dec = sexa2deg(object['dec'])
+            except (KeyError, AttributeError, ValueError):
+                # objects without a position can't be pointed at
+                continue
+            mag = toFloat(object.get('v_mag'))
+            if mag is None:
+                mag = toFloat(object.get('b_mag'))
+            db.execute(
+                'INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?)',
+                (i, object.get('name'), ra, dec, mag, json.dumps(object))
+            )
+
+            refs = set()
+            for catalog in CATALOGS:
+                values = object.get(catalog)
+                if not isinstance(values, list):
+                    values = [values]
+                refs.update(normRef(catalog, v) for v in values if v)
+            # lowercase lookup key -> name as spelled in the catalogue
+            names = {}
+            if object.get('name'):
+                refs.add(splitRef(object['name']))
+                names[object['name'].lower()] = object['name']
+            commonNames = object.get('common_names') or []
+            if isinstance(commonNames, str):
+                commonNames = commonNames.split(',')
+            for n in commonNames:
+                if n.strip():
+                    names.setdefault(n.strip().lower(), n.strip())
+
+            # first object wins on duplicated cross-identifications
+            db.executemany(
+                'INSERT OR IGNORE INTO refs VALUES (?, ?)',
+                [(ref, i) for ref in refs if ref]
+            )
+            db.executemany(
+                'INSERT OR IGNORE INTO names VALUES (?, ?, ?)',
+                [(name, display, i) for name, display in names.items()]
+            )
+        db.commit()
+        db.close()
+        os.replace(tmp, self.indexfile)
+
+    def db(self):
+        """ Return the shared connection to the index, rebuilding it if stale """
+        with Messier._lock:
+            db = Messier._connections.get(self.indexfile)
+            if db is not None:
+                return db
+            try:
+                stale = os.path.getmtime(self.indexfile) < \
+                    os.path.getmtime(self.datasource)
+            except OSError:
+                stale = True
+            if not stale:
+                db = sqlite3.connect('file:' + self.indexfile + '?mode=ro', uri=True)
+                stale = db.execute('PRAGMA user_version').fetchone()[0] != INDEX_VERSION
+                db.close()
+            if stale:
+                self.buildIndex()
+            db = sqlite3.connect(
+                'file:' + self.indexfile + '?mode=ro',
+                uri=True,
+                check_same_thread=False
+            )
+            Messier._connections[self.indexfile] = db
+            return db
+
+    @classmethod
+    def close(cls):
+        """ Close every open index, e.g. before rebuilding them """
+        with cls._lock:
+            for db in cls._connections.values():
+                db.close()
+            cls._connections.clear()
+
+    def __find(self, ref, catalog, columns):
+        key = normRef(catalog, ref)
+        row = self.db().execute(
+            'SELECT ' + columns + ' FROM objects WHERE id = ' +
+            '(SELECT id FROM refs WHERE key = ?)',
+            (key,)
+        ).fetchone()
+        if row is None:
+            row = self.db().execute(
+                'SELECT ' + columns + ' FROM objects WHERE id = ' +
+                '(SELECT id FROM names WHERE name = ?)',
+                (str(ref).strip().lower(),)
+            ).fetchone()
+        return row
 
     def getFromRef(self, ref, catalog):
-        data = json.load(open(self.datasource))
-        for object in data:
-            # if object[catalog] is a list, get the first element
-            if type(object[catalog]) == list:
-                if object[catalog][0] == ref:
-                    # we found the object
-                    break
-            elif object[catalog] == ref:
-                # we found the object
-                break
-            elif object['name'] == ref:
-                # we found the object
-                break
-
-        # convert array to dict
-        object = {k: v for k, v in object.items()}
-        return object
+        """ Return the catalogue record of an object, None if not found """
+        row = self.__find(ref, catalog, 'record')
+        return json.loads(row[0]) if row else None
+
+    def getPosFromRef(self, ref, catalog):
+        """ Return ra and dec in decimal degrees, None if not found """
+        row = self.__find(ref, catalog, 'ra, dec')
+        return (row[0], row[1]) if row else None
+
+    def getFromName(self, name):
+        """ Return the catalogue record of an object from its name """
+        row = self.db().execute(
+            'SELECT record FROM objects WHERE id = ' +
+            '(SELECT id FROM names WHERE name = ?)',
+            (name.strip().lower(),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def catalog(self):
+        """
+        Return a list of (name, ra, dec, mag) for every object of the index,
+        named after its Messier number when it has one
+        """
+        rows = self.db().execute(
+            "SELECT COALESCE((SELECT MIN(key) FROM refs " +
+            "WHERE refs.id = objects.id AND key GLOB 'M[0-9]*'), name), " +
+            "ra, dec, mag FROM objects ORDER BY id"
+        ).fetchall()
+        return rows
+
+    def names(self):
+        """
+        Return a list of (name, reference) for every catalogue reference and
+        common name of the index, common names spelled as in the catalogue
+        and pointing to the Messier reference of their object when it has
+        one, NGC then IC otherwise
+        """
+        db = self.db()
+        rows = [(key, key) for (key,) in db.execute('SELECT key FROM refs')]
+        names = db.execute(
+            "SELECT display, (SELECT key FROM refs WHERE refs.id = names.id " +
+            "ORDER BY key GLOB 'M[0-9]*' DESC, key GLOB 'NGC*' DESC, key " +
+            "LIMIT 1) FROM names"
+        ).fetchall()
+        # designations such as 'NGC0224' are already listed as references
+        return rows + [(name, ref) for name, ref in names if ref and splitRef(name) is None]
+
 
+if __name__ == '__main__':
+    m = Messier()
+    print('Building index of', m.datasource)
+    m.buildIndex()
+    print('Index written to', m.indexfile)
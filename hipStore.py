@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Compact column store of the Hipparcos catalogue.
+
+The gzipped catalogue is parsed once and the columns needed to build a
+skyfield Star are written as .npy files, one slot per HIP number, so that
+a lookup is a direct index into memory-mapped arrays.
+
+Usage: python hipStore.py    (rebuild the store)
+"""
+
+import os
+import threading
+import numpy as np
+from skyfield.api import Loader, Star
+from skyfield.data import hipparcos
+from ephemeris import DATA_DIR
+
+STORE_DIR = os.path.join(os.path.expanduser(DATA_DIR), 'hip_store')
+
+# last HIP number of the catalogue, arrays are indexed by HIP number
+HIP_MAX = 120416
+
+# column name -> dtype kept in the store
+COLUMNS = {
+    'ra_hours': np.float64,
+    'dec_degrees': np.float64,
+    'ra_mas_per_year': np.float32,
+    'dec_mas_per_year': np.float32,
+    'parallax_mas': np.float32,
+    'magnitude': np.float32,
+    'epoch_year': np.float32,
+}
+
+
+class HipStore:
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, storedir=STORE_DIR, rebuild=False, source=None):
+        """ source is the hip_main.dat file to build from, downloaded if None """
+        self.storedir = storedir
+        if rebuild or not self.exists():
+            self.build(source)
+        self.columns = {
+            name: np.load(self.__path(name), mmap_mode='r')
+            for name in COLUMNS
+        }
+
+    @classmethod
+    def get(cls):
+        """ Return the shared store, building it on first use """
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def __path(self, column):
+        return os.path.join(self.storedir, column + '.npy')
+
+    def exists(self):
+        return all(os.path.exists(self.__path(c)) for c in COLUMNS)
+
+    def build(self, source=None):
+        """ Parse the Hipparcos catalogue and write the column store """
+        # a plain loader, the catalogue doesn't need the planetary ephemeris
+        load = Loader(DATA_DIR)
+        with load.open(source or hipparcos.URL) as f:
+            df = hipparcos.load_dataframe(f)
+
+        os.makedirs(self.storedir, exist_ok=True)
+        hips = df.index.to_numpy(dtype=np.int64)
+        for name, dtype in COLUMNS.items():
+            column = np.full(HIP_MAX + 1, np.nan, dtype=dtype)
+            column[hips] = df[name].to_numpy(dtype=dtype)
+            # write to a temporary file so readers never see a partial column
+            tmp = self.__path(name) + '.tmp'
+            with open(tmp, 'wb') as f:
+                np.save(f, column)
+            os.replace(tmp, self.__path(name))
+
+    def has(self, hipID):
+        """ Return True if the HIP number has a position in the catalogue """
+        return 0 < hipID <= HIP_MAX and \
+            not np.isnan(self.columns['ra_hours'][hipID])
+
+    def row(self, hipID):
+        """ Return a dictionary with the catalogue columns of a star """
+        if not self.has(hipID):
+            raise KeyError(hipID)
+        return {name: float(self.columns[name][hipID]) for name in COLUMNS}
+
+    def star(self, hipID):
+        """ Return a skyfield Star for the given HIP number """
+        row = self.row(hipID)
+        return Star(
+                ra_hours=row['ra_hours'],
+                dec_degrees=row['dec_degrees'],
+                ra_mas_per_year=row['ra_mas_per_year'],
+                dec_mas_per_year=row['dec_mas_per_year'],
+                parallax_mas=row['parallax_mas'],
+                epoch=epochToJD(row['epoch_year'])
+            )
+
+    def stars(self, hipIDs):
+        """
+        Return a single skyfield Star built from arrays for all the given
+        HIP numbers, which must all be present in the catalogue
+        """
+        c = self.columns
+        i = np.asarray(hipIDs, dtype=np.int64)
+        return Star(
+                ra_hours=c['ra_hours'][i].astype(np.float64),
+                dec_degrees=c['dec_degrees'][i].astype(np.float64),
+                ra_mas_per_year=c['ra_mas_per_year'][i].astype(np.float64),
+                dec_mas_per_year=c['dec_mas_per_year'][i].astype(np.float64),
+                parallax_mas=c['parallax_mas'][i].astype(np.float64),
+                epoch=epochToJD(c['epoch_year'][i].astype(np.float64))
+            )
+
+
+def epochToJD(year):
+    """ Same conversion as Star.from_dataframe: epoch year to TT Julian date """
+    return 1721045.0 + 365.25 * year
+
+
+if __name__ == '__main__':
+    print('Building Hipparcos store in', STORE_DIR)
+    HipStore(rebuild=True)
+    print('Done')
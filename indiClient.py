@@ -1,6 +1,10 @@
 import logging
+import threading
+import time
 import PyIndi
 from device import Device
+from propertyMirror import PropertyMirror
+from callbackStats import CallbackStats
 
 # The IndiClient class which inherits from the module PyIndi.BaseClient class
 # Note that all INDI constants are accessible from the module as PyIndi.CONSTANTNAME
@@ -9,6 +13,19 @@ class IndiClient(PyIndi.BaseClient):
         super(IndiClient, self).__init__()
         self.logger = logging.getLogger('IndiClient')
         self.logger.info('creating an instance of IndiClient')
+        # one condition per (device, property) - property None for the device
+        # itself - all sharing one lock, with a version counter bumped by the
+        # callbacks, see waitFor
+        self.__lock = threading.Lock()
+        self.__conditions = {}
+        self.__versions = {}
+        # local copy of every device property, updated by the callbacks below
+        self.mirror = PropertyMirror()
+        # update counters and rate-limited logging of updateProperty
+        self.stats = CallbackStats(self.logger)
+        # functions called as listener(event, device, property) from the
+        # callbacks, property None for device events, see addListener
+        self.__listeners = ()
 
     def devices_names(self):
         return [d.getDeviceName() for d in self.getDevices()]
@@ -16,28 +33,114 @@ class IndiClient(PyIndi.BaseClient):
     def device_by_interface(self, interface):
         return [Device(x, self) for x in self.__devices_by_interface(interface)]
 
+    def waitDevice(self, name, timeout=5):
+        '''Return the device once the server has announced it, None after timeout seconds.'''
+        self.waitFor(lambda: self.getDevice(name), name, timeout=timeout)
+        return self.getDevice(name)
+
+    def waitFor(self, predicate, device, prop=None, timeout=None):
+        '''
+        Block until predicate() is true, evaluating it again each time the
+        server sends something about the device property (or the device itself
+        if prop is None). Return False if timeout seconds elapse first, wait
+        forever if timeout is None.
+        The predicate is evaluated without holding the lock, so it can safely
+        call into PyIndi.
+        '''
+        key = (device, prop)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.__lock:
+                version = self.__versions.get(key, 0)
+            if predicate():
+                return True
+            with self.__lock:
+                condition = self.__conditions.get(key)
+                if condition is None:
+                    condition = self.__conditions[key] = threading.Condition(self.__lock)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                condition.wait_for(lambda: self.__versions.get(key, 0) != version, remaining)
+
+    def addListener(self, listener):
+        '''
+        Call listener(event, device, property) after each callback, event
+        being one of 'newDevice', 'removeDevice', 'newProperty',
+        'updateProperty', 'removeProperty' or 'serverDisconnected'.
+        Listeners run on the PyIndi thread and must return quickly.
+        '''
+        with self.__lock:
+            self.__listeners = self.__listeners + (listener,)
+
+    def removeListener(self, listener):
+        with self.__lock:
+            self.__listeners = tuple(x for x in self.__listeners if x is not listener)
+
+    def __dispatch(self, event, device=None, prop=None):
+        for listener in self.__listeners:
+            try:
+                listener(event, device, prop)
+            except Exception:
+                self.logger.exception(f"listener failed on {event} {device} {prop}")
+
+    def __notify(self, device, prop=None):
+        key = (device, prop)
+        with self.__lock:
+            self.__versions[key] = self.__versions.get(key, 0) + 1
+            condition = self.__conditions.get(key)
+            if condition is not None:
+                condition.notify_all()
+
+    def __notifyAll(self):
+        with self.__lock:
+            for key, condition in self.__conditions.items():
+                self.__versions[key] = self.__versions.get(key, 0) + 1
+                condition.notify_all()
+
     def telescopes(self):
         return self.device_by_interface('telescope')
 
     def newDevice(self, d):
         '''Emmited when a new device is created from INDI server.'''
-        self.logger.info(f"new device {d.getDeviceName()}")
+        name = d.getDeviceName()
+        self.logger.info(f"new device {name}")
+        self.__notify(name)
+        self.__dispatch('newDevice', name)
 
     def removeDevice(self, d):
         '''Emmited when a device is deleted from INDI server.'''
-        self.logger.info(f"remove device {d.getDeviceName()}")
+        name = d.getDeviceName()
+        self.logger.info(f"remove device {name}")
+        self.mirror.removeDevice(name)
+        self.__notify(name)
+        self.__dispatch('removeDevice', name)
 
     def newProperty(self, p):
         '''Emmited when a new property is created for an INDI driver.'''
         self.logger.info(f"new property {p.getName()} as {p.getTypeAsString()} for device {p.getDeviceName()}")
+        self.mirror.update(p)
+        self.__notify(p.getDeviceName(), p.getName())
+        self.__dispatch('newProperty', p.getDeviceName(), p.getName())
 
     def updateProperty(self, p):
         '''Emmited when a new property value arrives from INDI server.'''
-        self.logger.info(f"update property {p.getName()} as {p.getTypeAsString()} for device {p.getDeviceName()}")
+        device, name = p.getDeviceName(), p.getName()
+        # this fires many times per second during a slew: count every update
+        # but only log (and format) one every few seconds per property
+        skipped = self.stats.record(device, name)
+        if skipped is not None:
+            self.logger.info(f"update property {name} as {p.getTypeAsString()} for device {device} ({skipped} updates not logged)")
+        self.mirror.update(p)
+        self.__notify(device, name)
+        self.__dispatch('updateProperty', device, name)
 
     def removeProperty(self, p):
         '''Emmited when a property is deleted for an INDI driver.'''
         self.logger.info(f"remove property {p.getName()} as {p.getTypeAsString()} for device {p.getDeviceName()}")
+        self.mirror.remove(p.getDeviceName(), p.getName())
+        self.__notify(p.getDeviceName(), p.getName())
+        self.__dispatch('removeProperty', p.getDeviceName(), p.getName())
 
     def newMessage(self, d, m):
         '''Emmited when a new message arrives from INDI server.'''
@@ -50,3 +153,7 @@ class IndiClient(PyIndi.BaseClient):
     def serverDisconnected(self, code):
         '''Emmited when the server gets disconnected.'''
         self.logger.info(f"Server disconnected (exit code = {code},{self.getHost()}:{self.getPort()})")
+        self.mirror.clear()
+        # let every waiter check its condition again
+        self.__notifyAll()
+        self.__dispatch('serverDisconnected')
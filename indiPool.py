@@ -0,0 +1,199 @@
+"""
+Pool of INDI connections, one warm IndiClient per server, and the mounts
+they drive.
+
+Mounts are read from the [INDI.n] sections of config.ini:
+
+    [INDI.1]
+    name = pier1
+    server = pier1.local
+    port = 7624
+    telescope_driver = EQMod Mount
+
+A plain [INDI] section is still understood as a single mount, named after
+its name option or 'default'. Mounts on the same server share one client.
+Numbered sections come first, in order, then the named ones ([INDI.dome]).
+"""
+
+import threading
+import time
+
+# seconds to wait for a telescope driver to be announced
+DEVICE_TIMEOUT = 5
+
+
+class Mount:
+    """ A telescope driver on an INDI server, and the health of its link """
+
+    def __init__(self, name, server, port, driver):
+        self.name = name
+        self.server = server
+        self.port = port
+        self.driver = driver
+        self.client = None
+        self.telescope = None
+        # health tracking
+        self.failures = 0
+        self.lastError = None
+        self.lastConnect = None
+
+    @property
+    def connected(self):
+        return self.client is not None and self.client.isServerConnected() \
+            and self.telescope is not None
+
+    def health(self):
+        """ Return a dictionary describing the state of the link """
+        return {
+            'name': self.name,
+            'server': '%s:%d' % (self.server, self.port),
+            'driver': self.driver,
+            'connected': self.connected,
+            'failures': self.failures,
+            'lastError': self.lastError,
+            'lastConnect': self.lastConnect
+        }
+
+
+def sectionKey(section):
+    """ Sort key of an [INDI.n] section: numbers in order, then names """
+    suffix = section.split('.', 1)[1]
+    return (0, int(suffix), '') if suffix.isdigit() else (1, 0, suffix)
+
+
+class IndiPool:
+
+    def __init__(self, cfg, clientFactory=None):
+        """
+        cfg is the parsed config.ini, clientFactory creates an IndiClient
+        (imported lazily by default, it pulls PyIndi in). ValueError if two
+        sections name the same mount.
+        """
+        self.clientFactory = clientFactory or self.__newClient
+        self.mounts = {}
+        self.clients = {}
+        self.__lock = threading.Lock()
+        # one lock per server, mounts sharing it connect it once
+        self.__serverLocks = {}
+        sections = sorted((s for s in cfg.sections() if s.startswith('INDI.')), key=sectionKey)
+        if not sections and cfg.has_section('INDI'):
+            sections = ['INDI']
+        for section in sections:
+            default = 'default' if section == 'INDI' else 'pier' + section.split('.', 1)[1]
+            mount = Mount(
+                cfg.get(section, 'name', fallback=default),
+                cfg.get(section, 'server'),
+                cfg.getint(section, 'port', fallback=7624),
+                cfg.get(section, 'telescope_driver')
+            )
+            if mount.name in self.mounts:
+                raise ValueError('mount %s is defined twice, in [%s]' % (mount.name, section))
+            self.mounts[mount.name] = mount
+
+    @staticmethod
+    def __newClient():
+        import indiClient
+        return indiClient.IndiClient()
+
+    def names(self):
+        return list(self.mounts)
+
+    def default(self):
+        """ The first configured mount """
+        return next(iter(self.mounts.values()), None)
+
+    def get(self, name):
+        """ Return a mount by name, KeyError if unknown """
+        return self.mounts[name]
+
+    def client(self, mount):
+        """ Return the client of the mount's server, created on first use """
+        key = (mount.server, mount.port)
+        with self.__lock:
+            client = self.clients.get(key)
+            if client is None:
+                client = self.clients[key] = self.clientFactory()
+                client.setServer(mount.server, mount.port)
+                self.__serverLocks[key] = threading.Lock()
+        mount.client = client
+        return client
+
+    def connectServer(self, mount):
+        """
+        Connect the mount's server if needed, without looking for its
+        driver. Return True on success, the error is kept in the mount's
+        health
+        """
+        try:
+            self.__connectServer(mount)
+        except ConnectionError as e:
+            mount.failures += 1
+            mount.lastError = str(e)
+            return False
+        mount.lastError = None
+        return True
+
+    def __connectServer(self, mount):
+        client = self.client(mount)
+        with self.__serverLocks[(mount.server, mount.port)]:
+            if not client.isServerConnected() and not client.connectServer():
+                raise ConnectionError('could not connect to %s:%d' % (mount.server, mount.port))
+        return client
+
+    def connect(self, mount):
+        """
+        Connect the mount's server if needed and find its telescope driver.
+        Return True on success, the error is kept in the mount's health
+        """
+        try:
+            client = self.__connectServer(mount)
+            mount.telescope = client.waitDevice(mount.driver, DEVICE_TIMEOUT)
+            if not mount.telescope:
+                raise ConnectionError("%s hasn't been found" % mount.driver)
+        except ConnectionError as e:
+            mount.failures += 1
+            mount.lastError = str(e)
+            mount.telescope = None
+            return False
+        mount.lastConnect = time.time()
+        mount.lastError = None
+        return True
+
+    def connectAll(self):
+        """ Connect every mount concurrently, return {name: success} """
+        return self.run(self.connect, self.mounts.values())
+
+    def discover(self, mount):
+        """ Return the names of the devices on the mount's server """
+        return self.client(mount).devices_names()
+
+    def health(self):
+        return [m.health() for m in self.mounts.values()]
+
+    def disconnectAll(self):
+        with self.__lock:
+            clients = list(self.clients.values())
+        for client in clients:
+            if client.isServerConnected():
+                client.disconnectServer()
+
+    @staticmethod
+    def run(function, mounts):
+        """
+        Call function(mount) for every mount in its own thread, return
+        {mount name: result}, the exception raised if any
+        """
+        results = {}
+
+        def call(mount):
+            try:
+                results[mount.name] = function(mount)
+            except Exception as e:
+                results[mount.name] = e
+
+        threads = [threading.Thread(target=call, args=(m,), daemon=True) for m in mounts]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
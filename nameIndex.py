@@ -0,0 +1,163 @@
+"""
+Sorted index of every target name the resolver understands: planets,
+Messier/NGC/IC references and common names, HIP numbers and BSC5P
+designations and proper names.
+
+Names are kept in a sorted list so that a prefix lookup is two bisections,
+each name pointing to the target passed to the resolver (Polaris points to
+'* alf UMi', Andromeda Galaxy to 'M31'). Misspelled names get the nearest
+names by edit distance.
+"""
+
+import threading
+from bisect import bisect_left
+import numpy as np
+from getPosFromBSC5P import BSC5P, normName
+from getPosFromMessier import Messier
+from hipStore import HipStore
+from resolver import planets
+
+# at most this many completions are returned
+MAX_COMPLETIONS = 200
+# number of suggestions for a misspelled name
+SUGGESTIONS = 5
+# characters counted to narrow the suggestions, any other one is counted
+# in a last shared column
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789 '
+
+
+def editDistance(a, b, limit):
+    """
+    Levenshtein distance between a and b, or limit + 1 as soon as it is
+    known to be larger than limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def charCounts(words):
+    """
+    Matrix of the number of each ALPHABET character (and of the other
+    characters, in the last column) in each of words
+    """
+    table = np.full(128, len(ALPHABET), dtype=np.int64)
+    table[[ord(c) for c in ALPHABET]] = np.arange(len(ALPHABET))
+    codes = np.frombuffer(''.join(words).encode('utf-32-le'), dtype=np.uint32)
+    classes = np.where(codes < 128, table[np.minimum(codes, 127)], len(ALPHABET))
+    rows = np.repeat(np.arange(len(words)), [len(w) for w in words])
+    width = len(ALPHABET) + 1
+    counts = np.bincount(rows * width + classes, minlength=len(words) * width)
+    return counts.reshape(len(words), width).astype(np.int16)
+
+
+class NameIndex:
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        entries = []
+        # (name, target, suggested when misspelled)
+        entries += [(p.capitalize(), p, True) for p in planets if p != 'EARTH']
+        entries += [(name, ref, True) for name, ref in Messier().names()]
+
+        index = BSC5P().index()
+        for star, hipID in zip(index['stars'], index['hips']):
+            names = star['namesAlt']
+            target = next((n for n in names if n.startswith('*')), None)
+            if target is None and hipID:
+                target = 'HIP%d' % hipID
+            if target is None:
+                continue
+            entries += [(n, target, True) for n in names if not n.startswith('HIP')]
+
+        store = HipStore.get()
+        hipIDs = np.flatnonzero(~np.isnan(store.columns['ra_hours']))
+        entries += [('HIP%d' % h, 'HIP%d' % h, False) for h in hipIDs]
+
+        entries.sort(key=lambda e: normName(e[0]))
+        self.keys = [normName(e[0]) for e in entries]
+        self.names = [e[0] for e in entries]
+        self.targets = [e[1] for e in entries]
+        # catalogue numbers are left out of the suggestions: a typo in a
+        # number is another valid number
+        self.words = [(normName(e[0]), e[0]) for e in entries if e[2]]
+        self.wordCounts = charCounts([w for w, display in self.words])
+
+    @classmethod
+    def get(cls):
+        """ Return the shared index, building it on first use """
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        """ Drop the shared index, e.g. after the catalogues were rebuilt """
+        with cls._lock:
+            cls._instance = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __range(self, prefix):
+        prefix = normName(prefix)
+        return bisect_left(self.keys, prefix), bisect_left(self.keys, prefix + '\uffff')
+
+    def complete(self, prefix):
+        """
+        Return the names starting with prefix (case and whitespace
+        insensitive), sorted. Past MAX_COMPLETIONS only the first ones and
+        the last one are returned, which keeps their common prefix.
+        """
+        lo, hi = self.__range(prefix)
+        if hi - lo > MAX_COMPLETIONS:
+            return self.names[lo:lo + MAX_COMPLETIONS - 1] + [self.names[hi - 1]]
+        return self.names[lo:hi]
+
+    def target(self, name):
+        """ Return the resolver target of a name, None if unknown """
+        key = normName(name)
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.targets[i]
+        return None
+
+    def suggest(self, name, count=SUGGESTIONS):
+        """ Return up to count names closest to name by edit distance """
+        key = normName(name)
+        limit = max(1, min(3, len(key) // 3))
+        # an edit changes at most one character in and one out: the
+        # characters missing from either word bound the edit distance, which
+        # leaves only a few words to compare
+        diff = self.wordCounts - charCounts([key])[0]
+        bound = np.maximum(np.clip(diff, 0, None).sum(axis=1), np.clip(-diff, 0, None).sum(axis=1))
+        scored = []
+        for i in np.flatnonzero(bound <= limit):
+            word, display = self.words[i]
+            d = editDistance(key, word, limit)
+            if d <= limit:
+                scored.append((d, display))
+        scored.sort()
+        result = []
+        for d, display in scored:
+            if display not in result:
+                result.append(display)
+            if len(result) == count:
+                break
+        return result
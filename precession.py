@@ -0,0 +1,141 @@
+"""
+Precession and nutation from J2000 to the equinox of date, as rotation
+matrices applied to unit vectors.
+
+Precession uses the IAU 1976 angles, nutation the largest terms of the IAU
+1980 series (better than 0.5", see Meeus, Astronomical Algorithms, ch. 22).
+Both change slowly, so the matrix of a date is kept for VALIDITY days and
+reused: converting a position is one 3x3 matrix product, and a whole array
+of positions converts at once. Aberration is not applied.
+See bench/check_precession.py for the agreement with astropy/ERFA.
+"""
+
+import time
+import numpy as np
+
+# Julian date of J2000.0
+JD_J2000 = 2451545.0
+# Julian date of the Unix epoch
+JD_UNIX_EPOCH = 2440587.5
+# a cached matrix is reused for this many days, it drifts by less than 0.3"
+VALIDITY = 1.0
+
+ARCSEC = np.pi / 180 / 3600
+
+# nutate -> (jd of the matrix, matrix), entries are replaced as a whole
+_cache = {}
+
+
+def julianDate(t=None):
+    """ Julian date (UTC) of a Unix timestamp, now if not given """
+    if t is None:
+        t = time.time()
+    return JD_UNIX_EPOCH + np.asarray(t, dtype=np.float64) / 86400.0
+
+
+def rotX(a):
+    c, s = np.cos(a), np.sin(a)
+    return np.array([[1, 0, 0], [0, c, s], [0, -s, c]])
+
+
+def rotY(a):
+    c, s = np.cos(a), np.sin(a)
+    return np.array([[c, 0, -s], [0, 1, 0], [s, 0, c]])
+
+
+def rotZ(a):
+    c, s = np.cos(a), np.sin(a)
+    return np.array([[c, s, 0], [-s, c, 0], [0, 0, 1]])
+
+
+def precessionMatrix(jd):
+    """
+    Rotation matrix from the J2000 mean equator and equinox to the mean
+    equator and equinox of date (IAU 1976 precession angles)
+    """
+    T = (jd - JD_J2000) / 36525.0
+    zeta = (2306.2181 * T + 0.30188 * T ** 2 + 0.017998 * T ** 3) * ARCSEC
+    z = (2306.2181 * T + 1.09468 * T ** 2 + 0.018203 * T ** 3) * ARCSEC
+    theta = (2004.3109 * T - 0.42665 * T ** 2 - 0.041833 * T ** 3) * ARCSEC
+    return rotZ(-z) @ rotY(theta) @ rotZ(-zeta)
+
+
+def nutation(jd):
+    """
+    Nutation in longitude and obliquity and mean obliquity of the
+    ecliptic at jd, radians
+    """
+    T = (jd - JD_J2000) / 36525.0
+    # longitude of the ascending node of the Moon, mean longitudes of the
+    # Sun and the Moon
+    omega = np.radians(125.04452 - 1934.136261 * T)
+    L = np.radians(280.4665 + 36000.7698 * T)
+    Lm = np.radians(218.3165 + 481267.8813 * T)
+    dPsi = (-17.20 * np.sin(omega) - 1.32 * np.sin(2 * L)
+            - 0.23 * np.sin(2 * Lm) + 0.21 * np.sin(2 * omega)) * ARCSEC
+    dEps = (9.20 * np.cos(omega) + 0.57 * np.cos(2 * L)
+            + 0.10 * np.cos(2 * Lm) - 0.09 * np.cos(2 * omega)) * ARCSEC
+    eps0 = (84381.448 - 46.8150 * T - 0.00059 * T ** 2 + 0.001813 * T ** 3) * ARCSEC
+    return dPsi, dEps, eps0
+
+
+def nutationMatrix(jd):
+    """ Rotation matrix from the mean to the true equator and equinox of date """
+    dPsi, dEps, eps0 = nutation(jd)
+    return rotX(-(eps0 + dEps)) @ rotZ(-dPsi) @ rotX(eps0)
+
+
+def dateMatrix(jd=None, nutate=True):
+    """
+    Rotation matrix from J2000 to the true (mean if nutate is False)
+    equator and equinox of date jd, now if not given. The matrix of a
+    previous call is returned while jd is within VALIDITY days of it.
+    """
+    if jd is None:
+        jd = float(julianDate())
+    cached = _cache.get(nutate)
+    if cached is not None and abs(jd - cached[0]) < VALIDITY:
+        return cached[1]
+    m = precessionMatrix(jd)
+    if nutate:
+        m = nutationMatrix(jd) @ m
+    _cache[nutate] = (jd, m)
+    return m
+
+
+def rotate(m, ra, dec):
+    """ Apply a rotation matrix to ra and dec in degrees, scalars or arrays """
+    ra = np.radians(np.asarray(ra, dtype=np.float64))
+    dec = np.radians(np.asarray(dec, dtype=np.float64))
+    v = np.stack([
+        np.cos(dec) * np.cos(ra),
+        np.cos(dec) * np.sin(ra),
+        np.sin(dec)
+    ])
+    x, y, z = np.tensordot(m, v, axes=1)
+    return np.mod(np.degrees(np.arctan2(y, x)), 360.0), \
+        np.degrees(np.arcsin(np.clip(z, -1.0, 1.0)))
+
+
+def precess(ra, dec, jd, toJ2000=False):
+    """
+    Precess J2000 ra and dec (degrees, scalars or arrays) to the mean
+    equinox of date jd, or positions of date jd back to J2000 if toJ2000
+    is set
+    """
+    m = dateMatrix(jd, nutate=False)
+    return rotate(m.T if toJ2000 else m, ra, dec)
+
+
+def toDate(ra, dec, jd=None):
+    """
+    Convert J2000/ICRS ra and dec (degrees, scalars or arrays) to the true
+    equator and equinox of date jd (now if not given), as expected by the
+    EQUATORIAL_EOD_COORD property of INDI mounts
+    """
+    return rotate(dateMatrix(jd), ra, dec)
+
+
+def fromDate(ra, dec, jd=None):
+    """ Convert positions of the true equinox of date back to J2000 """
+    return rotate(dateMatrix(jd).T, ra, dec)
@@ -0,0 +1,154 @@
+import threading
+from collections import namedtuple
+import PyIndi
+
+# Immutable snapshot of an INDI property, values holds one Element per widget
+PropertyRecord = namedtuple('PropertyRecord', [
+    'device', 'name', 'label', 'group', 'type', 'state',
+    'perm_read', 'perm_write', 'rule', 'values', 'version'
+])
+
+# min, max, step and format are only set for numbers
+Element = namedtuple('Element', ['name', 'label', 'value', 'min', 'max', 'step', 'format'],
+                     defaults=[None, None, None, None])
+
+STATE_TO_STR = { PyIndi.IPS_IDLE: 'IDLE', PyIndi.IPS_OK: 'OK', PyIndi.IPS_BUSY: 'BUSY', PyIndi.IPS_ALERT: 'ALERT' }
+SWITCH_TYPES = { PyIndi.ISR_1OFMANY: 'ONE_OF_MANY', PyIndi.ISR_ATMOST1: 'AT_MOST_ONE', PyIndi.ISR_NOFMANY: 'ANY'}
+TYPE_TO_STR = { PyIndi.INDI_NUMBER: 'number', PyIndi.INDI_SWITCH: 'switch', PyIndi.INDI_TEXT: 'text', PyIndi.INDI_LIGHT: 'light', PyIndi.INDI_BLOB: 'blob', PyIndi.INDI_UNKNOWN: 'unknown' }
+
+
+class PropertyMirror:
+    """
+    In-process copy of the properties of every device, kept up to date by
+    the IndiClient callbacks.
+    Records are immutable and each device maps to a dictionary that is
+    replaced, never modified, on every change: a reader takes a consistent
+    snapshot of a device by grabbing that dictionary, in O(1), and never
+    blocks the callback thread for longer than a dictionary lookup.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__devices = {}
+        # bumped on every change, for cheap "has anything changed" checks
+        self.version = 0
+
+    def update(self, p):
+        """ Record the current state of a PyIndi property, return the record """
+        # read the property before taking the lock
+        record = self.__read(p)
+        with self.__lock:
+            properties = self.__devices.get(record.device, {})
+            previous = properties.get(record.name)
+            record = record._replace(version=previous.version + 1 if previous else 1)
+            properties = dict(properties)
+            properties[record.name] = record
+            self.__devices[record.device] = properties
+            self.version += 1
+        return record
+
+    def remove(self, device, name):
+        """ Forget a property """
+        with self.__lock:
+            properties = dict(self.__devices.get(device, {}))
+            if properties.pop(name, None) is not None:
+                self.__devices[device] = properties
+                self.version += 1
+
+    def removeDevice(self, device):
+        """ Forget every property of a device """
+        with self.__lock:
+            if self.__devices.pop(device, None) is not None:
+                self.version += 1
+
+    def clear(self):
+        with self.__lock:
+            self.__devices = {}
+            self.version += 1
+
+    def snapshot(self, device):
+        """ Return the read-only {name: record} dictionary of a device """
+        with self.__lock:
+            return self.__devices.get(device, {})
+
+    def has(self, device):
+        return device in self.__devices
+
+    def get(self, device, name):
+        """ Return the record of a property, None if unknown """
+        return self.snapshot(device).get(name)
+
+    def values(self, device, name):
+        """ Return {element: value} for a property, None if unknown """
+        record = self.get(device, name)
+        if record is None:
+            return None
+        return {e.name: e.value for e in record.values}
+
+    @staticmethod
+    def toDict(record):
+        """ Convert a record to the dictionary returned by Device.get_property """
+        result = {
+            'name': record.name,
+            'label': record.label,
+            'group': record.group,
+            'device': record.device,
+            'type': record.type,
+            'state': record.state,
+            'perm_read': record.perm_read,
+            'perm_write': record.perm_write
+        }
+        if record.rule is not None:
+            result['rule'] = record.rule
+        if record.type == 'number':
+            result['values'] = [
+                {'name': e.name, 'label': e.label, 'value': e.value, 'min': e.min, 'max': e.max, 'step': e.step, 'format': e.format}
+                for e in record.values
+            ]
+        elif record.type in ('switch', 'text', 'light'):
+            result['values'] = [{'name': e.name, 'label': e.label, 'value': e.value} for e in record.values]
+        return result
+
+    @staticmethod
+    def __read(p):
+        ptype = p.getType()
+        permission = p.getPermission()
+        rule = None
+        if ptype == PyIndi.INDI_NUMBER:
+            values = tuple(
+                Element(w.getName(), w.getLabel(), w.getValue(), w.getMin(), w.getMax(), w.getStep(), w.getFormat())
+                for w in PyIndi.PropertyNumber(p)
+            )
+        elif ptype == PyIndi.INDI_SWITCH:
+            switch = PyIndi.PropertySwitch(p)
+            rule = SWITCH_TYPES.get(switch.getRule())
+            values = tuple(
+                Element(w.getName(), w.getLabel(), w.getState() == PyIndi.ISS_ON)
+                for w in switch
+            )
+        elif ptype == PyIndi.INDI_TEXT:
+            values = tuple(
+                Element(w.getName(), w.getLabel(), w.getText())
+                for w in PyIndi.PropertyText(p)
+            )
+        elif ptype == PyIndi.INDI_LIGHT:
+            values = tuple(
+                Element(w.getName(), w.getLabel(), STATE_TO_STR[w.getState()])
+                for w in PyIndi.PropertyLight(p)
+            )
+        else:
+            # BLOBs are not mirrored
+            values = ()
+        return PropertyRecord(
+            device=p.getDeviceName(),
+            name=p.getName(),
+            label=p.getLabel(),
+            group=p.getGroupName(),
+            type=TYPE_TO_STR.get(ptype, 'unknown'),
+            state=STATE_TO_STR.get(p.getState()),
+            perm_read=permission in [PyIndi.IP_RO, PyIndi.IP_RW],
+            perm_write=permission in [PyIndi.IP_WO, PyIndi.IP_RW],
+            rule=rule,
+            values=values,
+            version=0
+        )
@@ -0,0 +1,122 @@
+"""
+Bounded LRU cache of the positions returned by resolv.resolve, so that
+'show M42' followed by 'goto M42' resolves M42 once.
+
+Entries are keyed by (normalised target, observatory, time bucket): the
+time bucket is the current time divided by the time to live of the object
+type, so an entry is never reused once its bucket is over. The time to
+live follows how fast the apparent position moves: seconds for the Moon, a
+minute for the planets and the Sun, an hour for the stars and a day for
+the deep-sky objects, whose catalogue position never changes.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# positions kept, the least recently used one is dropped beyond
+SIZE = 256
+# seconds a position stays valid, per object type of resolv.classify
+TTL = {
+    'Moon': 10.0,
+    'Planet': 60.0,
+    'Star': 3600.0,
+    'Hipparcos': 3600.0,
+    'Messier': 86400.0,
+    'NGC': 86400.0,
+    'IC': 86400.0,
+}
+
+
+def normalise(target):
+    """ Key of a target name: case and spacing don't matter """
+    return ' '.join(target.split()).upper()
+
+
+def site(pos):
+    """ Key of an observatory position """
+    return (float(pos['lat']), float(pos['lon']), float(pos['elev']))
+
+
+def ttl(objectType, target):
+    """ Time to live in seconds of a position of target """
+    if objectType == 'Planet' and normalise(target) == 'MOON':
+        objectType = 'Moon'
+    return TTL.get(objectType, 0.0)
+
+
+class ResolveCache:
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls):
+        """ Return the cache shared by the whole process """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self, size=SIZE):
+        self.size = size
+        # key -> (value, expiry time)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def key(target, pos, seconds, now):
+        """ Key of target seen from pos, in the time bucket of now """
+        return (normalise(target), site(pos), int(now // seconds))
+
+    def lookup(self, target, objectType, pos, now=None):
+        """ Return the cached value of target seen from pos, None on a miss """
+        seconds = ttl(objectType, target)
+        if seconds <= 0:
+            return None
+        now = time.time() if now is None else now
+        key = self.key(target, pos, seconds, now)
+        with self.__lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def store(self, target, objectType, pos, value, now=None):
+        """ Cache the value of target seen from pos """
+        seconds = ttl(objectType, target)
+        if seconds <= 0:
+            return
+        now = time.time() if now is None else now
+        key = self.key(target, pos, seconds, now)
+        # the end of the bucket
+        expiry = (key[2] + 1) * seconds
+        with self.__lock:
+            self.entries[key] = (value, expiry)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """ Forget every position, e.g. when the observatory changes """
+        with self.__lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.__lock:
+            return {
+                'entries': len(self.entries),
+                'size': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -1,16 +1,26 @@
 import sys
-from skyfield.api import Topos, Loader, Star
-from skyfield.data import hipparcos
+import numpy as np
+import tracing
+from skyfield.api import Star
+from ephemeris import Ephemeris
+from hipStore import HipStore, HIP_MAX
+from ephemCache import EphemerisCache
+from altaz import radec2altaz
 from getPosFromBSC5P import BSC5P
 from getPosFromMessier import Messier
-from astropy.coordinates import EarthLocation, SkyCoord
-from astropy.time import Time
-from astropy import units as u
-from astropy.coordinates import AltAz
+
+planets = [
+        'MERCURY', 'VENUS', 'EARTH', 'MARS', 'JUPITER',
+        'SATURN', 'URANUS', 'NEPTUNE', 'PLUTO', 'MOON',
+        'SUN'
+    ]
 
 
 class resolv:
 
+    # engine used by getAltAz: 'native' (NumPy, see altaz.py) or 'astropy'
+    altazEngine = 'native'
+
     def __init__(self, obj):
         self.obj = obj
         self.obs_location = None
@@ -19,12 +29,30 @@ class resolv:
         self.DEC = "decimal"
         self.SEX = "sexagesimal"
 
-    # Get the altitude and azimuth of an object using astropy from its ra and dec
+    # Get the altitude and azimuth of an object from its ra and dec
     def getAltAz(self, target):
         """
-        Get the altitude and azimuth of an object at the given time
-        target: dictionary with ra and dec in decimal degrees
+        Get the altitude and azimuth of an object at the current time
+        target: dictionary with ra and dec in decimal degrees, ICRS/J2000
+        The computation is done by the engine selected in altazEngine.
         """
+        with tracing.span('altaz.' + self.altazEngine):
+            return self.__altaz(target)
+
+    def __altaz(self, target):
+        if self.altazEngine == 'native':
+            return radec2altaz(
+                    target['ra'],
+                    target['dec'],
+                    self.pos['lat'],
+                    self.pos['lon'],
+                    j2000=True
+                )
+
+        # astropy is slow to import, only load it when it is the engine
+        from astropy.coordinates import EarthLocation, SkyCoord, AltAz
+        from astropy.time import Time
+        from astropy import units as u
         observing_location = EarthLocation(
                 lat=self.pos['lat'],
                 lon=self.pos['lon'],
@@ -38,10 +66,14 @@ class resolv:
 
     # define a function that allows to get coordinates of any object
     def getPos(self, obj):
-        """ Get the position of an object at the given time"""
-        astrometric = self.obs_location.at(self.t).observe(obj)
-        appa = astrometric.apparent()
-        ra, dec, distance = appa.radec()
+        """
+        Get the apparent position of an object at the given time. Skyfield
+        gives it on the ICRS/J2000 axes, as getAltAz expects it.
+        """
+        with tracing.span('skyfield'):
+            astrometric = self.obs_location.at(self.t).observe(obj)
+            appa = astrometric.apparent()
+            ra, dec, distance = appa.radec()
         ra = ra._degrees
         dec = dec._degrees
         return ra, dec
@@ -89,110 +121,240 @@ class resolv:
     def setPos(self, lat, lon, elev):
         self.pos = {'lat': lat, 'lon': lon, 'elev': elev}
 
-    def resolve(self):
-        obj = self.obj
-        load = Loader('~/skyfield-data')
-        planetsDB = load('de421.bsp')
-        # Location of the observer and tgt
-        earth = planetsDB['earth']
-
-        self.obs_location = earth + Topos(
-                self.pos['lat'],
-                self.pos['lon'],
-                elevation_m=self.pos['elev']
-            )
-
-        planets = [
-                'MERCURY', 'VENUS', 'EARTH', 'MARS', 'JUPITER',
-                'SATURN', 'URANUS', 'NEPTUNE', 'PLUTO', 'MOON',
-                'SUN'
-            ]
-
-        if obj.upper() in planets:
-            objectType = 'Planet'
-        elif obj.startswith('*'):
-            objectType = 'Star'
-        elif obj.upper().startswith('HIP') and int(obj[3:]) in range(1, 120404):
-            objectType = 'Hipparcos'
-        elif obj.upper().startswith('M') and int(obj[1:]) in range(1, 111):
-            objectType = 'Messier'
-            type = 'm'
-            obj = obj.upper()
-        elif obj.upper().startswith('NGC') and int(obj[3:]) in range(1, 7840):
-            objectType = 'NGC'
-            type = objectType.lower()
-            obj = obj.upper()
-        elif obj.upper().startswith('IC') and int(obj[2:]) in range(1, 5386):
-            objectType = 'IC'
-            type = objectType.lower()
-            obj = obj.upper()
-        else:
+    def classify(self, obj):
+        """
+        Return the object type of a target, the target name as the
+        catalogues expect it and the catalogue to look it up in
+        """
+        type = None
+        try:
+            if obj.upper() in planets:
+                objectType = 'Planet'
+            elif obj.startswith('*'):
+                objectType = 'Star'
+            elif obj.upper().startswith('HIP') and 0 < int(obj[3:]) <= HIP_MAX:
+                objectType = 'Hipparcos'
+            elif obj.upper().startswith('M') and int(obj[1:]) in range(1, 111):
+                objectType = 'Messier'
+                type = 'm'
+                obj = obj.upper()
+            elif obj.upper().startswith('NGC') and int(obj[3:]) in range(1, 7840):
+                objectType = 'NGC'
+                type = objectType.lower()
+                obj = obj.upper()
+            elif obj.upper().startswith('IC') and int(obj[2:]) in range(1, 5386):
+                objectType = 'IC'
+                type = objectType.lower()
+                obj = obj.upper()
+            else:
+                objectType = 'unknown'
+        except ValueError:
+            # e.g. a name starting with M that isn't a Messier number
             objectType = 'unknown'
+        return objectType, obj, type
 
+    def announce(self, objectType, obj):
+        """ Print the line resolve() starts with for a target of objectType """
         match objectType:
             case 'Planet':
                 if obj.lower() == 'pluto':
                     print('Pluto is not a planet anymore')
                 else:
                     print('Getting coordinates of Planet', obj.upper())
-                if (obj.lower() == 'moon') or (obj.lower() == 'sun'):
-                    tgt = planetsDB[obj]
-                else:
-                    tgt = planetsDB[obj.lower() + ' barycenter']
+            case 'Star':
+                print('Getting coordinates of Star', obj.upper())
+            case 'Hipparcos':
+                print('Getting coordinates of Hipparcos object' + obj)
+            case 'Messier' | 'NGC' | 'IC':
+                print('Getting coordinates of', objectType + ' object ' + obj)
 
-                ts = load.timescale()
-                self.t = ts.now()
-                ra, dec = self.getPos(tgt)
+    def checkHorizon(self, objectType, obj, coord):
+        """ Warn if coord (as resolve() returns it) is below the horizon """
+        alt, az = self.getAltAz(coord)
+        if alt >= 0:
+            return
+        match objectType:
+            case 'Planet':
+                print('Planet', obj.upper(), ' is below the horizon')
+            case 'Star' | 'Hipparcos':
+                print('Star is below the horizon')
+            case _:
+                print('Object is below the horizon')
+
+    def summary(self, ra, dec):
+        """
+        Print what resolve() prints for a position it returned before,
+        e.g. kept in the resolve cache
+        """
+        objectType, obj, type = self.classify(self.obj)
+        self.announce(objectType, obj)
+        self.checkHorizon(objectType, obj, {'ra': ra, 'dec': dec})
+
+    def resolve(self):
+        obj = self.obj
+        with tracing.span('ephemeris'):
+            # ephemeris and timescale are shared by every resolve of the process
+            eph = Ephemeris.get()
+            # Location of the observer, rebuilt only when the site changes
+            self.obs_location = eph.observer(self.pos)
+
+        objectType, obj, type = self.classify(obj)
+
+        match objectType:
+            case 'Planet':
+                self.announce(objectType, obj)
+                self.t = eph.now()
+                # answered by the per-night interpolated ephemeris if any
+                cache = EphemerisCache.lookup(self.pos, self.t)
+                if cache is not None and cache.has(obj):
+                    with tracing.span('ephemeris.cache'):
+                        ra, dec = map(float, cache.radec(obj, self.t.tt))
+                else:
+                    ra, dec = self.getPos(eph.body(obj))
                 self.coord = {'ra': ra, 'dec': dec}
-                alt, az = self.getAltAz(self.coord)
-                if alt < 0:
-                    print('Planet', obj.upper(), ' is below the horizon')
+                self.checkHorizon(objectType, obj, self.coord)
                 return ra, dec
 
             case 'Star':
-                print('Getting coordinates of Star', obj.upper())
-                hipID = 0
-                with load.open(hipparcos.URL) as f:
-                    df = hipparcos.load_dataframe(f)
-
-                hipID = int(BSC5P().getHipFromBayer(obj))
+                self.announce(objectType, obj)
+                with tracing.span('catalogue.bsc5p'):
+                    hipID = int(BSC5P().getHipFromBayer(obj))
                 try:
-                    tgt = Star.from_dataframe(df.loc[hipID])
+                    with tracing.span('catalogue.hipparcos'):
+                        tgt = HipStore.get().star(hipID)
                 except KeyError:
                     print('Star not found in Hipparcos catalog')
                     return None, None
-                ts = load.timescale()
-                self.t = ts.now()
+                self.t = eph.now()
                 ra, dec = self.getPos(tgt)
-                alt, az = self.getAltAz({'ra': ra, 'dec': dec})
-                if alt < 0:
-                    print('Star is below the horizon')
-
+                self.checkHorizon(objectType, obj, {'ra': ra, 'dec': dec})
                 return ra, dec
 
             case 'Hipparcos':
-                print('Getting coordinates of Hipparcos object' + obj)
+                self.announce(objectType, obj)
                 hipID = int(obj[3:])
-                with load.open(hipparcos.URL) as f:
-                    df = hipparcos.load_dataframe(f)
-                tgt = Star.from_dataframe(df.loc[hipID])
-                ts = load.timescale()
-                self.t = ts.now()
+                try:
+                    with tracing.span('catalogue.hipparcos'):
+                        tgt = HipStore.get().star(hipID)
+                except KeyError:
+                    print('Star not found in Hipparcos catalog')
+                    return None, None
+                self.t = eph.now()
                 ra, dec = self.getPos(tgt)
-                alt, az = self.getAltAz({'ra': ra, 'dec': dec})
-                if alt < 0:
-                    print('Star is below the horizon')
+                self.checkHorizon(objectType, obj, {'ra': ra, 'dec': dec})
                 return ra, dec
 
             case 'Messier' | 'NGC' | 'IC':
-                print('Getting coordinates of', objectType + ' object ' + obj)
-                tgt = Messier().getFromRef(obj, type)
-                ra, dec = self.hms2deg(tgt['ra']), self.dms2deg(tgt['dec'])
-                alt, az = self.getAltAz({'ra': ra, 'dec': dec})
-                if alt < 0:
-                    print('Object is below the horizon')
+                self.announce(objectType, obj)
+                with tracing.span('catalogue.ngc'):
+                    tgt = Messier().getPosFromRef(obj, type)
+                if tgt is None:
+                    print('Object not found in catalog')
+                    return None, None
+                ra, dec = tgt
+                self.checkHorizon(objectType, obj, {'ra': ra, 'dec': dec})
                 return ra, dec
 
             case _:
                 print('Unknown object type')
 
+    def resolve_many(self, targets):
+        """
+        Resolve a list of targets in one pass, without printing.
+        Targets are grouped by type: every star (Bayer or HIP) is computed
+        through a single array-backed Star, every deep-sky object through
+        another one, planets one body at a time.
+        Return a dictionary of arrays aligned with targets: ra, dec (decimal
+        degrees, as resolve() returns them), alt, az (degrees) and status,
+        a list holding 'ok', 'unknown' or 'not found' for each target.
+        """
+        with tracing.span('ephemeris'):
+            eph = Ephemeris.get()
+            self.obs_location = eph.observer(self.pos)
+            self.t = eph.now()
+            observer = self.obs_location.at(self.t)
+
+        n = len(targets)
+        result = {
+            'ra': np.full(n, np.nan),
+            'dec': np.full(n, np.nan),
+            'alt': np.full(n, np.nan),
+            'az': np.full(n, np.nan),
+            'status': ['ok'] * n
+        }
+
+        planetIdx = []
+        starIdx, hipIDs = [], []
+        dsoIdx, dsoRa, dsoDec = [], [], []
+        # opened by the first star only: it may have to be built
+        store = None
+        for i, target in enumerate(targets):
+            objectType, obj, type = self.classify(target)
+            match objectType:
+                case 'Planet':
+                    planetIdx.append(i)
+                case 'Star' | 'Hipparcos':
+                    if objectType == 'Star':
+                        hipID = int(BSC5P().getHipFromBayer(obj))
+                    else:
+                        hipID = int(obj[3:])
+                    if store is None:
+                        store = HipStore.get()
+                    if store.has(hipID):
+                        starIdx.append(i)
+                        hipIDs.append(hipID)
+                    else:
+                        result['status'][i] = 'not found'
+                case 'Messier' | 'NGC' | 'IC':
+                    tgt = Messier().getPosFromRef(obj, type)
+                    if tgt is None:
+                        result['status'][i] = 'not found'
+                    else:
+                        dsoIdx.append(i)
+                        dsoRa.append(tgt[0])
+                        dsoDec.append(tgt[1])
+                case _:
+                    result['status'][i] = 'unknown'
+
+        def storeApparent(idx, apparent, radec=True):
+            idx = np.asarray(idx, dtype=np.int64)
+            if radec:
+                ra, dec, distance = apparent.radec()
+                result['ra'][idx] = ra._degrees
+                result['dec'][idx] = dec.degrees
+            alt, az, distance = apparent.altaz()
+            result['alt'][idx] = alt.degrees
+            result['az'][idx] = az.degrees
+
+        cache = EphemerisCache.lookup(self.pos, self.t)
+        for i in planetIdx:
+            if cache is not None and cache.has(targets[i]):
+                ra, dec = cache.radec(targets[i], self.t.tt)
+                result['ra'][i], result['dec'][i] = ra, dec
+                # apparent place on the ICRS axes, as fitted from
+                # apparent().radec(): precessed to the date by radec2altaz
+                result['alt'][i], result['az'][i] = radec2altaz(
+                    ra, dec, self.pos['lat'], self.pos['lon'], j2000=True)
+                continue
+            with tracing.span('skyfield'):
+                body = eph.body(targets[i])
+                storeApparent([i], observer.observe(body).apparent())
+
+        if starIdx:
+            with tracing.span('skyfield'):
+                stars = store.stars(hipIDs)
+                storeApparent(starIdx, observer.observe(stars).apparent())
+
+        if dsoIdx:
+            # deep-sky objects keep their catalogue coordinates, as in
+            # resolve(), only alt/az are computed
+            result['ra'][dsoIdx] = dsoRa
+            result['dec'][dsoIdx] = dsoDec
+            dsos = Star(
+                    ra_hours=np.array(dsoRa) / 15,
+                    dec_degrees=np.array(dsoDec)
+                )
+            with tracing.span('skyfield'):
+                storeApparent(dsoIdx, observer.observe(dsos).apparent(), radec=False)
+
+        return result
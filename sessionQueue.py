@@ -0,0 +1,285 @@
+"""
+Observing session queue: the targets are resolved in one pass, then ordered
+to keep the total slew angle small while every target stays above the
+horizon, and doesn't cross the meridian, for as long as it is observed.
+
+The order is built by a nearest-neighbour tour from the current position of
+the mount, improved by 2-opt moves (reversing a stretch of the tour) as long
+as they shorten it and keep the schedule feasible.
+"""
+
+from collections import namedtuple
+import numpy as np
+from altaz import gmst, radec2altaz
+from precession import julianDate, precess
+
+# time spent observing a target when none is given, seconds
+DWELL = 60.0
+# slew speed assumed to schedule the targets, degrees per second
+SLEW_RATE = 2.0
+# a meridian flip costs as much as a slew of this many degrees
+FLIP_COST = 90.0
+# stop improving the tour after this many passes of 2-opt
+PASSES = 10
+# hour angle change, degrees per day
+SIDEREAL_RATE = 360.98564736629
+
+Entry = namedtuple('Entry', ['name', 'dwell'])
+
+# A scheduled target: ra/dec as resolved (decimal degrees), when the slew to
+# it should start and end (Julian dates), its altitude when the dwell starts
+# and the slew angle from the previous position (degrees)
+Step = namedtuple('Step', ['entry', 'ra', 'dec', 'start', 'arrival', 'alt', 'slew'])
+
+
+def parseEntry(line):
+    """ Parse 'target [dwell]', return an Entry or None for an empty line """
+    words = line.split('#', 1)[0].split()
+    if not words:
+        return None
+    dwell = DWELL
+    if len(words) > 1:
+        try:
+            dwell = float(words[-1])
+            words = words[:-1]
+        except ValueError:
+            pass
+    return Entry(' '.join(words), dwell)
+
+
+def readTargets(path):
+    """ Read a file with one 'target [dwell]' per line, # starts a comment """
+    with open(path, 'r') as f:
+        return [e for e in map(parseEntry, f) if e is not None]
+
+
+def separations(ra, dec, ra0=None, dec0=None):
+    """
+    Angular distances in degrees between the positions ra, dec (arrays of
+    degrees), or from each of them to ra0, dec0 when given
+    """
+    ra, dec = np.radians(ra), np.radians(dec)
+    v = np.stack([np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)], axis=-1)
+    if ra0 is None:
+        dot = v @ v.T
+    else:
+        ra0, dec0 = np.radians(ra0), np.radians(dec0)
+        dot = v @ np.array([np.cos(dec0) * np.cos(ra0), np.cos(dec0) * np.sin(ra0), np.sin(dec0)])
+    return np.degrees(np.arccos(np.clip(dot, -1.0, 1.0)))
+
+
+def hourAngle(ra, lon, jd):
+    """ Hour angle in degrees, in [-180, 180[, negative East of the meridian """
+    return np.mod(gmst(jd) + lon - ra + 180.0, 360.0) - 180.0
+
+
+def crossesMeridian(ra, lon, start, end):
+    """
+    True where ra (degrees of date) crosses the meridian (hour angle 0)
+    between the Julian dates start and end, less than half a day apart
+    """
+    ha = hourAngle(ra, lon, start)
+    return (ha < 0) & (ha + SIDEREAL_RATE * (end - start) >= 0)
+
+
+class SessionQueue:
+
+    def __init__(self):
+        self.entries = []
+
+    def add(self, name, dwell=DWELL):
+        self.entries.append(Entry(name, dwell))
+
+    def extend(self, entries):
+        self.entries.extend(entries)
+
+    def clear(self):
+        self.entries = []
+
+    def remove(self, name):
+        """ Remove the first entry named name, return False if there is none """
+        for i, entry in enumerate(self.entries):
+            if entry.name == name:
+                del self.entries[i]
+                return True
+        return False
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def target(r, name):
+        """
+        Return the resolver target of name: proper and common names (Vega,
+        Andromeda Galaxy) are looked up in the name index, as goto does
+        """
+        if r.classify(name)[0] != 'unknown':
+            return name
+        from nameIndex import NameIndex
+        return NameIndex.get().target(name) or name
+
+    def plan(self, pos, start=None, minAlt=0.0, meridian=True, jd=None):
+        """
+        Resolve every target and order them for observer pos. start is the
+        current (ra, dec) of the mount in degrees, if known. Targets that
+        would be below minAlt degrees during their dwell, or cross the
+        meridian if meridian is set, are left out.
+        Return the list of Steps and the list of (entry, reason) left out.
+        """
+        from resolver import resolv
+        if jd is None:
+            jd = float(julianDate())
+        entries = list(self.entries)
+        if not entries:
+            return [], []
+        r = resolv('')
+        r.setPosFromDict(pos)
+        resolved = r.resolve_many([self.target(r, e.name) for e in entries])
+
+        skipped = []
+        keep = []
+        for i, status in enumerate(resolved['status']):
+            if status == 'ok':
+                keep.append(i)
+            else:
+                skipped.append((entries[i], status))
+        if not keep:
+            return [], skipped
+        keep = np.array(keep)
+        planner = _Planner(
+            [entries[i] for i in keep],
+            resolved['ra'][keep], resolved['dec'][keep],
+            pos, start, minAlt, meridian, jd
+        )
+        order, unreachable = planner.solve()
+        skipped += [(planner.entries[i], 'below horizon') for i in unreachable]
+        return planner.steps(order), skipped
+
+
+class _Planner:
+    """ Nearest neighbour + 2-opt ordering of resolved targets """
+
+    def __init__(self, entries, ra, dec, pos, start, minAlt, meridian, jd):
+        self.entries = entries
+        self.ra, self.dec = np.asarray(ra, dtype=np.float64), np.asarray(dec, dtype=np.float64)
+        self.lat, self.lon = pos['lat'], pos['lon']
+        self.minAlt = minAlt
+        self.meridian = meridian
+        self.jd = jd
+        self.dwell = np.array([e.dwell for e in entries]) / 86400.0
+        # positions of date for the altitude and hour angle, precession
+        # over one night is negligible
+        self.raDate, self.decDate = precess(self.ra, self.dec, jd)
+
+        n = len(entries)
+        self.sep = separations(self.ra, self.dec)
+        if start is None:
+            # no known position: the first target costs nothing
+            self.startSep = np.zeros(n)
+            self.startSide = None
+        else:
+            self.startSep = separations(self.ra, self.dec, *start)
+            self.startSide = bool(hourAngle(start[0], self.lon, jd) >= 0)
+
+    def move(self, previous, i, t, side):
+        """
+        Slew from previous (None for the start position) to target i
+        starting at Julian date t with the mount on side. Return the cost in
+        degrees, a flip counting as FLIP_COST, and the side of i when the
+        slew ends: the pier side is the one of the scheduled time.
+        """
+        cost = self.startSep[i] if previous is None else self.sep[previous, i]
+        if not self.meridian:
+            return cost, None
+        newSide = bool(hourAngle(self.raDate[i], self.lon, t + cost / SLEW_RATE / 86400.0) >= 0)
+        if side is not None and newSide != side:
+            cost += FLIP_COST
+        return cost, newSide
+
+    def schedule(self, order):
+        """
+        Arrival and end of dwell (Julian dates) of the targets of order, and
+        the cost of the slews to them
+        """
+        arrival, end, slews = np.empty(len(order)), np.empty(len(order)), np.empty(len(order))
+        t, side, previous = self.jd, self.startSide, None
+        for k, i in enumerate(order):
+            slews[k], side = self.move(previous, i, t, side)
+            arrival[k] = t + slews[k] / SLEW_RATE / 86400.0
+            end[k] = t = arrival[k] + self.dwell[i]
+            previous = i
+        return arrival, end, slews
+
+    def feasible(self, order):
+        """ Return a boolean array, True where a target of order can be observed """
+        arrival, end, slews = self.schedule(order)
+        order = np.asarray(order, dtype=np.int64)
+        ra, dec = self.raDate[order], self.decDate[order]
+        ok = np.ones(len(order), dtype=bool)
+        for t in (arrival, end):
+            alt, az = radec2altaz(ra, dec, self.lat, self.lon, jd=t)
+            ok &= alt >= self.minAlt
+        if self.meridian:
+            ok &= ~crossesMeridian(ra, self.lon, arrival, end)
+        return ok
+
+    def length(self, order):
+        return float(self.schedule(order)[2].sum())
+
+    def solve(self):
+        """ Return the order of the targets and the ones that can't be observed """
+        order = self.nearestNeighbour()
+        order = self.twoOpt(order)
+        unreachable = sorted(set(range(len(self.entries))) - set(order))
+        return order, unreachable
+
+    def nearestNeighbour(self):
+        remaining = set(range(len(self.entries)))
+        order = []
+        t, side = self.jd, self.startSide
+        while remaining:
+            previous = order[-1] if order else None
+            costs = {j: self.move(previous, j, t, side)[0] for j in remaining}
+            candidates = sorted(remaining, key=lambda j: costs[j])
+            for j in candidates:
+                if self.feasible(order + [j])[-1]:
+                    cost, side = self.move(previous, j, t, side)
+                    t += cost / SLEW_RATE / 86400.0 + self.dwell[j]
+                    order.append(j)
+                    remaining.discard(j)
+                    break
+            else:
+                # nothing left can be observed from here
+                break
+        return order
+
+    def twoOpt(self, order):
+        n = len(order)
+        best = self.length(order)
+        for _ in range(PASSES):
+            improved = False
+            for i in range(n - 1):
+                for j in range(i + 1, n):
+                    # reverse order[i..j]: the flips depend on the times the
+                    # targets are reached, so the whole tour is costed again
+                    candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                    length = self.length(candidate)
+                    if length < best - 1e-9 and self.feasible(candidate).all():
+                        order, best = candidate, length
+                        improved = True
+            if not improved:
+                break
+        return order
+
+    def steps(self, order):
+        arrival, end, slews = self.schedule(order)
+        steps = []
+        previous = None
+        for k, i in enumerate(order):
+            slew = self.startSep[i] if previous is None else self.sep[previous, i]
+            alt, az = radec2altaz(self.raDate[i], self.decDate[i], self.lat, self.lon, jd=arrival[k])
+            start = self.jd if k == 0 else end[k - 1]
+            steps.append(Step(self.entries[i], float(self.ra[i]), float(self.dec[i]),
+                              float(start), float(arrival[k]), float(alt), float(slew)))
+            previous = i
+        return steps
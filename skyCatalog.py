@@ -0,0 +1,77 @@
+"""
+Whole-sky table of the BSC5P stars and NGC/IC/Messier objects as NumPy
+arrays, built once per process, for computations over every object at
+once.
+"""
+
+import threading
+import numpy as np
+from hipStore import HipStore
+from getPosFromBSC5P import BSC5P
+from getPosFromMessier import Messier
+
+STAR = 0
+DSO = 1
+
+# J2000.0 as a Julian year, the catalogue positions are brought to it
+J2000 = 2000.0
+
+
+class SkyCatalog:
+    """
+    names, kinds (STAR or DSO), ra and dec (decimal degrees, J2000) and
+    mag arrays, aligned. Stars are taken from the Hipparcos store with
+    their proper motion applied up to J2000; magnitude is NaN when the
+    catalogue has none.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        stars = BSC5P().catalog()
+        store = HipStore.get()
+        stars = [(name, hipID) for name, hipID in stars if store.has(hipID)]
+        hipIDs = np.array([hipID for name, hipID in stars], dtype=np.int64)
+        c = store.columns
+        dt = J2000 - c['epoch_year'][hipIDs].astype(np.float64)
+        # a few stars have no proper motion
+        pmRa = np.nan_to_num(c['ra_mas_per_year'][hipIDs].astype(np.float64))
+        pmDec = np.nan_to_num(c['dec_mas_per_year'][hipIDs].astype(np.float64))
+        starDec = c['dec_degrees'][hipIDs] + pmDec * dt / 3.6e6
+        # Hipparcos proper motion in RA already includes cos(dec)
+        starRa = c['ra_hours'][hipIDs] * 15 + \
+            pmRa * dt / 3.6e6 / np.cos(np.radians(starDec))
+        starMag = c['magnitude'][hipIDs].astype(np.float64)
+
+        dsos = Messier().catalog()
+        dsoRa = np.array([row[1] for row in dsos], dtype=np.float64)
+        dsoDec = np.array([row[2] for row in dsos], dtype=np.float64)
+        dsoMag = np.array(
+            [np.nan if row[3] is None else row[3] for row in dsos],
+            dtype=np.float64
+        )
+
+        self.names = np.array(
+            [name for name, hipID in stars] + [row[0] for row in dsos],
+            dtype=object
+        )
+        self.kinds = np.concatenate([
+            np.full(len(stars), STAR, dtype=np.int8),
+            np.full(len(dsos), DSO, dtype=np.int8)
+        ])
+        self.ra = np.mod(np.concatenate([starRa, dsoRa]), 360.0)
+        self.dec = np.concatenate([starDec, dsoDec])
+        self.mag = np.concatenate([starMag, dsoMag])
+
+    @classmethod
+    def get(cls):
+        """ Return the shared table, building it on first use """
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def __len__(self):
+        return len(self.names)
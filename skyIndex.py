@@ -0,0 +1,107 @@
+"""
+Zone index over the SkyCatalog for cone searches.
+
+The sky is cut into declination zones ZONE degrees high; inside a zone the
+objects are sorted by right ascension. A cone search only looks at the
+zones it overlaps and, in each of them, at the right ascension window
+found by bisection, then keeps the objects whose unit vector is within the
+radius. A query touches a few dozen objects instead of the whole catalogue.
+"""
+
+import threading
+import numpy as np
+from skyCatalog import SkyCatalog
+
+# height of a declination zone, degrees
+ZONE = 1.0
+
+
+def unitVectors(ra, dec):
+    """ Unit vectors of positions in degrees, one row per position """
+    ra, dec = np.radians(ra), np.radians(dec)
+    return np.stack([np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)], axis=-1)
+
+
+class SkyIndex:
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, catalog=None):
+        self.catalog = catalog or SkyCatalog.get()
+        ra, dec = self.catalog.ra, self.catalog.dec
+        self.zones = int(np.ceil(180.0 / ZONE))
+        zone = self.__zone(dec)
+        # catalogue rows sorted by zone, then right ascension
+        self.order = np.lexsort((ra, zone))
+        self.ra = ra[self.order]
+        self.vectors = unitVectors(self.ra, dec[self.order])
+        # objects of zone z are order[starts[z]:starts[z + 1]]
+        self.starts = np.searchsorted(zone[self.order], np.arange(self.zones + 1))
+
+    @classmethod
+    def get(cls):
+        """ Return the shared index, building it on first use """
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def __zone(self, dec):
+        return np.clip(((np.asarray(dec) + 90.0) / ZONE).astype(np.int64), 0, self.zones - 1)
+
+    def __candidates(self, ra, dec, radius):
+        """ Rows (in index order) of the zones and RA windows of the cone """
+        first, last = self.__zone([max(dec - radius, -90.0), min(dec + radius, 90.0)])
+        if dec + radius >= 90.0 or dec - radius <= -90.0:
+            alpha = 180.0
+        else:
+            r, d = np.radians(radius), np.radians(dec)
+            alpha = np.degrees(np.arctan(np.sin(r) / np.sqrt(abs(np.cos(d - r) * np.cos(d + r)))))
+        if alpha >= 180.0:
+            windows = [(0.0, 360.0)]
+        elif ra - alpha < 0.0:
+            windows = [(0.0, ra + alpha), (ra - alpha + 360.0, 360.0)]
+        elif ra + alpha > 360.0:
+            windows = [(ra - alpha, 360.0), (0.0, ra + alpha - 360.0)]
+        else:
+            windows = [(ra - alpha, ra + alpha)]
+
+        parts = []
+        for z in range(first, last + 1):
+            start, end = self.starts[z], self.starts[z + 1]
+            zoneRa = self.ra[start:end]
+            for lo, hi in windows:
+                i = np.searchsorted(zoneRa, lo, side='left')
+                j = np.searchsorted(zoneRa, hi, side='right')
+                if j > i:
+                    parts.append(np.arange(start + i, start + j))
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+    def cone(self, ra, dec, radius):
+        """
+        Return the catalogue rows within radius degrees of ra, dec (degrees,
+        J2000) and their separations in degrees, closest first
+        """
+        rows = self.__candidates(ra, dec, radius)
+        dot = self.vectors[rows] @ unitVectors(ra, dec)
+        inside = dot >= np.cos(np.radians(radius))
+        rows, dot = rows[inside], dot[inside]
+        separations = np.degrees(np.arccos(np.clip(dot, -1.0, 1.0)))
+        nearest = np.argsort(separations)
+        return self.order[rows[nearest]], separations[nearest]
+
+    def nearest(self, ra, dec, count=5, maxRadius=10.0):
+        """
+        Return the count catalogue rows closest to ra, dec and their
+        separations, looking no further than maxRadius degrees
+        """
+        radius = min(0.5, maxRadius)
+        while True:
+            rows, separations = self.cone(ra, dec, radius)
+            if len(rows) >= count or radius >= maxRadius:
+                return rows[:count], separations[:count]
+            radius = min(radius * 4, maxRadius)
@@ -0,0 +1,149 @@
+import math
+import threading
+import time
+from collections import deque, namedtuple
+
+PROPERTY = 'EQUATORIAL_EOD_COORD'
+
+# What the monitor knows after the last update of the mount position:
+# ra/dec of the mount (degrees), distance to the target (degrees), rate
+# (degrees per second, None until two samples), eta (seconds, None if
+# unknown), state of the property, done once the slew is over (ok tells
+# whether it succeeded) and stalled if the mount stopped getting closer
+Progress = namedtuple('Progress', ['ra', 'dec', 'distance', 'rate', 'eta', 'state', 'done', 'ok', 'stalled'])
+
+
+def separation(ra1, dec1, ra2, dec2):
+    """ Angular separation in degrees between two positions in degrees """
+    ra1, dec1, ra2, dec2 = map(math.radians, (ra1, dec1, ra2, dec2))
+    h = math.sin((dec2 - dec1) / 2) ** 2 + \
+        math.cos(dec1) * math.cos(dec2) * math.sin((ra2 - ra1) / 2) ** 2
+    return math.degrees(2 * math.asin(min(1.0, math.sqrt(h))))
+
+
+def abortMotion(client, telescope):
+    """ Ask the mount to stop moving, without waiting for the answer """
+    import PyIndi
+    abort = telescope.getSwitch("TELESCOPE_ABORT_MOTION")
+    if not abort:
+        return False
+    abort.reset()
+    abort[0].setState(PyIndi.ISS_ON)
+    client.sendNewProperty(abort)
+    return True
+
+
+class SlewMonitor:
+    """
+    Follow a slew from the EQUATORIAL_EOD_COORD updates sent by the
+    server, instead of polling the property.
+    Usage:
+        monitor = SlewMonitor(client, 'Telescope Simulator', ra, dec)
+        with monitor:
+            client.sendNewProperty(radec)
+            progress = monitor.wait(1.0)
+            while not progress.done:
+                ...
+                progress = monitor.wait(1.0)
+    """
+
+    # samples used to estimate the slew rate
+    SAMPLES = 8
+    # seconds without getting closer before the slew is considered stalled
+    STALL_TIME = 5.0
+    # closer than this (degrees) the mount is considered on target
+    ARRIVED = 1 / 60
+    # seconds for the mount to report the slew (BUSY) before it is
+    # considered refused
+    ACK_TIME = 5.0
+
+    def __init__(self, client, device, ra, dec):
+        """ ra and dec of the target in decimal degrees, equinox of date """
+        self.client = client
+        self.device = device
+        self.target = (ra, dec)
+        self.samples = deque(maxlen=self.SAMPLES)
+        self.condition = threading.Condition()
+        self.updates = 0
+        record = client.mirror.get(device, PROPERTY)
+        # updates older than this belong to the previous slew
+        self.startVersion = record.version if record else 0
+        self.progress = None
+        self.bestDistance = None
+        self.bestTime = None
+        # until the mount reports BUSY, an IDLE/OK update may have been
+        # sent before it took the new target
+        self.busySeen = False
+        self.started = time.monotonic()
+
+    def __enter__(self):
+        self.client.addListener(self.__listener)
+        return self
+
+    def __exit__(self, *args):
+        self.client.removeListener(self.__listener)
+
+    def __listener(self, event, device, prop):
+        if device != self.device or prop != PROPERTY or event != 'updateProperty':
+            return
+        record = self.client.mirror.get(device, PROPERTY)
+        if record is None or record.version <= self.startVersion:
+            return
+        values = {e.name: e.value for e in record.values}
+        now = time.monotonic()
+        with self.condition:
+            self.progress = self.__sample(now, values['RA'] * 15, values['DEC'], record.state)
+            self.updates += 1
+            self.condition.notify_all()
+
+    def __sample(self, now, ra, dec, state):
+        distance = separation(ra, dec, *self.target)
+        if state == 'BUSY':
+            self.busySeen = True
+        if not self.busySeen and distance > self.ARRIVED:
+            # position before the slew started, nothing to learn from it
+            refused = now - self.started > self.ACK_TIME
+            return Progress(ra, dec, distance, None, None, state, refused, False, False)
+        self.samples.append((now, distance))
+        if self.bestDistance is None or distance < self.bestDistance - self.ARRIVED / 10:
+            self.bestDistance = distance
+            self.bestTime = now
+
+        rate = eta = None
+        if len(self.samples) >= 2:
+            (t0, d0), (t1, d1) = self.samples[0], self.samples[-1]
+            if t1 > t0:
+                rate = (d0 - d1) / (t1 - t0)
+                if rate > 0:
+                    eta = distance / rate
+
+        done = state != 'BUSY'
+        ok = done and state != 'ALERT'
+        stalled = not done and distance > self.ARRIVED and \
+            now - self.bestTime > self.STALL_TIME
+        return Progress(ra, dec, distance, rate, eta, state, done, ok, stalled)
+
+    def wait(self, timeout=None):
+        """
+        Block until the next position update or timeout seconds, return the
+        latest Progress (None if the server hasn't answered yet)
+        """
+        with self.condition:
+            seen = self.updates
+            self.condition.wait_for(lambda: self.updates != seen, timeout)
+            progress = self.progress
+            # set by the listener with progress, read them together
+            busySeen, bestTime = self.busySeen, self.bestTime
+        now = time.monotonic()
+        if progress is None or progress.done:
+            return progress
+        if not busySeen:
+            # the mount never reported the slew
+            if now - self.started > self.ACK_TIME:
+                progress = progress._replace(done=True, ok=False)
+        else:
+            # no update at all is a stall too
+            stalled = now - bestTime > self.STALL_TIME and \
+                progress.distance > self.ARRIVED
+            progress = progress._replace(stalled=stalled)
+        return progress
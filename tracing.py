@@ -0,0 +1,181 @@
+"""
+Timing spans around the stages of the hot paths (resolve, lookFor, goto),
+grouped by CLI command, see the profile command.
+
+    with tracing.span('catalogue.ngc'):
+        tgt = Messier().getPosFromRef(obj, type)
+
+Tracing is off by default: span() then returns a shared do-nothing context
+manager, so a disabled span costs one global lookup and a call. Spans may
+be opened from any thread; they belong to the command running when they
+start, their nesting is tracked per thread.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# commands kept for profile show and export
+HISTORY = 50
+
+enabled = False
+
+_lock = threading.Lock()
+_local = threading.local()
+# completed commands, oldest first
+_commands = deque(maxlen=HISTORY)
+# command running now, spans started outside of any command are dropped
+_current = None
+
+
+class _NoSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOSPAN = _NoSpan()
+
+
+class Command:
+    """ A traced command: its line, start and duration and its spans """
+
+    def __init__(self, line):
+        self.line = line
+        self.start = time.perf_counter()
+        self.duration = None
+        # thread running the command, other threads may add spans
+        self.thread = threading.get_ident()
+        # (name, start, duration, depth, thread id)
+        self.spans = []
+
+
+class Span:
+
+    __slots__ = ('name', 'command', 'start', 'depth')
+
+    def __init__(self, name, command):
+        self.name = name
+        self.command = command
+
+    def __enter__(self):
+        stack = getattr(_local, 'depth', 0)
+        self.depth = stack
+        _local.depth = stack + 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.start
+        _local.depth = self.depth
+        with _lock:
+            self.command.spans.append(
+                (self.name, self.start, duration, self.depth, threading.get_ident()))
+        return False
+
+
+class _CommandSpan:
+    """ Opens a Command for the duration of a CLI command """
+
+    def __init__(self, line):
+        self.line = line
+
+    def __enter__(self):
+        global _current
+        _current = Command(self.line)
+        return _current
+
+    def __exit__(self, *exc):
+        global _current
+        command, _current = _current, None
+        if command is not None:
+            command.duration = time.perf_counter() - command.start
+            with _lock:
+                _commands.append(command)
+        return False
+
+
+def span(name):
+    """ Context manager timing the stage name of the current command """
+    if not enabled:
+        return _NOSPAN
+    command = _current
+    if command is None:
+        return _NOSPAN
+    return Span(name, command)
+
+
+def command(line):
+    """ Context manager grouping the spans of a CLI command """
+    if not enabled:
+        return _NOSPAN
+    return _CommandSpan(line)
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def clear():
+    with _lock:
+        _commands.clear()
+
+
+def commands(count=None):
+    """ The last count completed commands, oldest first """
+    with _lock:
+        result = list(_commands)
+    return result if count is None else result[-count:]
+
+
+def breakdown(command):
+    """
+    Time per stage of a command: a list of (name, depth, total seconds,
+    calls) in order of first start
+    """
+    stages = {}
+    for name, start, duration, depth, tid in sorted(command.spans, key=lambda s: s[1]):
+        stage = stages.setdefault((name, depth), [name, depth, 0.0, 0])
+        stage[2] += duration
+        stage[3] += 1
+    return [tuple(s) for s in stages.values()]
+
+
+def other(command):
+    """
+    Seconds of command spent outside of its outermost spans. Only the
+    spans of the command's thread count: the ones of the threads it starts
+    (a broadcast slew) overlap each other.
+    """
+    covered = sum(duration for name, start, duration, depth, tid in command.spans
+                  if depth == 0 and tid == command.thread)
+    return max(0.0, command.duration - covered)
+
+
+def export(path, count=None):
+    """
+    Write the spans of the last count commands as a Chrome trace (JSON
+    object format, {'traceEvents': [...]}, for chrome://tracing or
+    Perfetto), return the number of events written
+    """
+    pid = os.getpid()
+    events = []
+    for command in commands(count):
+        events.append({
+            'name': command.line, 'cat': 'command', 'ph': 'X', 'pid': pid, 'tid': command.thread,
+            'ts': command.start * 1e6, 'dur': command.duration * 1e6,
+        })
+        for name, start, duration, depth, tid in command.spans:
+            events.append({
+                'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': pid, 'tid': tid,
+                'ts': start * 1e6, 'dur': duration * 1e6,
+            })
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return len(events)
@@ -0,0 +1,143 @@
+"""
+Background loading of the ephemeris and the catalogues while the CLI
+connects to INDI, so that the first goto doesn't pay for them.
+
+The data sets are loaded one after the other by a single thread, in the
+order of LOADERS (names and spatial use the catalogues loaded before
+them). Each has a readiness event: a command waits only for the data sets
+it uses, see require(). Nothing is printed from the thread, a failure is
+kept in errors and the command needing the data set then loads it itself,
+reporting the error as it did without warm-up.
+"""
+
+import threading
+import time
+
+
+def loadEphemeris():
+    # Skyfield is imported by the resolver
+    import resolver  # noqa: F401
+    from ephemeris import Ephemeris
+    Ephemeris.get()
+
+
+def loadBSC5P():
+    from getPosFromBSC5P import BSC5P
+    BSC5P().index()
+
+
+def loadNGC():
+    from getPosFromMessier import Messier
+    Messier().db()
+
+
+def loadHipparcos():
+    from hipStore import HipStore
+    HipStore.get()
+
+
+def loadNames():
+    from nameIndex import NameIndex
+    NameIndex.get()
+
+
+def loadSpatial():
+    from skyIndex import SkyIndex
+    SkyIndex.get()
+
+
+LOADERS = {
+    'ephemeris': loadEphemeris,
+    'bsc5p': loadBSC5P,
+    'ngc': loadNGC,
+    'hipparcos': loadHipparcos,
+    'names': loadNames,
+    'spatial': loadSpatial,
+}
+
+# data sets used to resolve each object type of resolv.classify
+NEEDS = {
+    'Planet': ('ephemeris',),
+    'Star': ('ephemeris', 'bsc5p', 'hipparcos'),
+    'Hipparcos': ('ephemeris', 'hipparcos'),
+    'Messier': ('ephemeris', 'ngc'),
+    'NGC': ('ephemeris', 'ngc'),
+    'IC': ('ephemeris', 'ngc'),
+    'unknown': ('names',),
+}
+
+
+class Warmup:
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, loaders=None):
+        self.loaders = dict(loaders or LOADERS)
+        self.events = {name: threading.Event() for name in self.loaders}
+        # name -> exception of the data sets that failed to load
+        self.errors = {}
+        # name -> seconds spent loading
+        self.durations = {}
+        self.current = None
+        self.thread = None
+
+    @classmethod
+    def get(cls):
+        """ Return the shared warm-up, not started until start() """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def start(self):
+        """ Start loading in the background, once """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.__run, name='warmup', daemon=True)
+            self.thread.start()
+
+    def __run(self):
+        for name, loader in self.loaders.items():
+            self.current = name
+            started = time.perf_counter()
+            try:
+                loader()
+            except Exception as e:
+                self.errors[name] = e
+            self.durations[name] = time.perf_counter() - started
+            self.events[name].set()
+        self.current = None
+
+    @property
+    def started(self):
+        return self.thread is not None
+
+    def ready(self, name):
+        """ True once name is loaded (or failed), or if warm-up isn't running """
+        return not self.started or name not in self.events or self.events[name].is_set()
+
+    def require(self, *names, timeout=None):
+        """
+        Wait until the data sets names are loaded. Return at once if
+        warm-up wasn't started: the data sets are then loaded on first use.
+        Return False after timeout seconds.
+        """
+        waiting = [n for n in names if not self.ready(n)]
+        if not waiting:
+            return True
+        print("Waiting for", ", ".join(waiting), "...")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name in waiting:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self.events[name].wait(remaining):
+                return False
+        return True
+
+    def progress(self):
+        """ Return (data sets loaded, data sets) """
+        return sum(e.is_set() for e in self.events.values()), len(self.events)
+
+    @property
+    def done(self):
+        loaded, total = self.progress()
+        return loaded == total